@@ -0,0 +1,135 @@
+# analytics.py
+# Aggregates the answer event log (event_log.py) into Parquet tables: per-card difficulty,
+# distractor-selection rates and per-chapter accuracy. Everything is a vectorized pandas
+# groupby over the raw event columns, so millions of events take seconds.
+# Usage: python analytics.py [--events answers.events] [--deck iot_flashcards_v2.csv] [--out analytics]
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from compiled_deck import load_compiled_deck
+from event_log import EVENT_LOG, read_events
+
+# --- Configuration ---
+DATA_FILE = 'iot_flashcards_v2.csv'
+OUTPUT_DIR = 'analytics'
+UNKNOWN_CHAPTER = '(not in deck)' # Cards answered earlier but since removed from the deck
+
+
+def deck_frame(deck):
+    """One row per card of the current deck: key, chapter, question, answer mask and deck position."""
+    cards = deck.cards
+    frame = pd.DataFrame({
+        'card_key': deck.card_keys.astype(np.int64),
+        'chapter': [card.chapter for card in cards],
+        'question': [card.question for card in cards],
+        'answer_mask': np.fromiter((card.answer_mask for card in cards), dtype=np.uint64, count=len(cards)),
+        'position': np.arange(len(cards)),
+    })
+    return frame.drop_duplicates('card_key') # A repeated chapter + question shares one key
+
+
+def attach_cards(events, cards):
+    """Adds each event's row in `cards` (-1 for cards no longer in the deck) as a 'card' column."""
+    events['card'] = pd.Index(cards['card_key']).get_indexer(events['card_key'])
+    return events
+
+
+def card_difficulty(events, cards):
+    """Attempts, accuracy and latency per card; difficulty = 1 - accuracy."""
+    stats = events.groupby('card_key').agg(
+        attempts=('correct', 'size'),
+        correct=('correct', 'sum'),
+        learners=('learner', 'nunique'),
+        median_latency=('latency', 'median'),
+        last_answered=('time', 'max'),
+    ).reset_index()
+    stats['accuracy'] = stats['correct'] / stats['attempts']
+    stats['difficulty'] = 1.0 - stats['accuracy']
+    stats = stats.merge(cards[['card_key', 'chapter', 'question']], on='card_key', how='left')
+    stats['chapter'] = stats['chapter'].fillna(UNKNOWN_CHAPTER)
+    return stats.sort_values(['difficulty', 'attempts'], ascending=[False, False], ignore_index=True)
+
+
+def distractor_rates(events, cards, deck):
+    """How often each wrong option of each card was picked, as a share of the card's attempts."""
+    attempts = events.groupby('card_key').size().rename('attempts')
+    wrong = events.loc[(events['correct'] == 0) & (events['card'] >= 0), ['card_key', 'selected', 'card']]
+    rows = wrong['card'].to_numpy()
+    # Options picked that are not answers, as bits; one vectorized pass per option position
+    distractors = wrong['selected'].to_numpy(np.uint64) & ~cards['answer_mask'].to_numpy()[rows]
+    parts = []
+    for bit in range(int(distractors.max()).bit_length() if len(distractors) else 0):
+        picked = ((distractors >> np.uint64(bit)) & np.uint64(1)) == 1
+        if picked.any():
+            parts.append(pd.DataFrame({'card_key': wrong['card_key'].to_numpy()[picked], 'card': rows[picked], 'option_index': bit}))
+    if not parts:
+        return pd.DataFrame(columns=['card_key', 'option_index', 'option', 'picks', 'attempts', 'pick_rate'])
+    picks = pd.concat(parts).groupby(['card_key', 'card', 'option_index']).size().rename('picks').reset_index()
+    picks = picks.join(attempts, on='card_key')
+    picks['pick_rate'] = picks['picks'] / picks['attempts']
+    # Option text, looked up only for the (card, option) pairs that were picked
+    positions = cards['position'].to_numpy()[picks.pop('card').to_numpy()]
+    picks['option'] = [deck.cards[pos].options[idx] for pos, idx in zip(positions.tolist(), picks['option_index'].tolist())]
+    return picks.sort_values('pick_rate', ascending=False, ignore_index=True)
+
+
+def chapter_accuracy(events, cards):
+    """Attempts and accuracy per chapter."""
+    chapter_codes, chapter_names = pd.factorize(cards['chapter'])
+    rows = events['card'].to_numpy()
+    # Group on integer chapter codes; the extra last code collects cards no longer in the deck
+    codes = np.where(rows >= 0, chapter_codes[rows], len(chapter_names))
+    stats = events[['correct', 'card_key', 'learner']].groupby(codes).agg(
+        attempts=('correct', 'size'),
+        correct=('correct', 'sum'),
+        cards=('card_key', 'nunique'),
+        learners=('learner', 'nunique'),
+    )
+    names = np.append(np.asarray(chapter_names, dtype=object), UNKNOWN_CHAPTER)
+    stats.insert(0, 'chapter', names[stats.index.to_numpy()])
+    stats['accuracy'] = stats['correct'] / stats['attempts']
+    return stats.sort_values('accuracy', ignore_index=True)
+
+
+def run_analytics(events_path, csv_path, out_dir):
+    """Writes the three tables as Parquet files into out_dir and returns them.
+
+    csv_path is the flashcard CSV the events refer to (loaded through its compiled deck).
+    """
+    events = pd.DataFrame(read_events(events_path))
+    deck = load_compiled_deck(csv_path).to_deck()
+    cards = deck_frame(deck)
+    attach_cards(events, cards)
+    tables = {
+        'card_difficulty': card_difficulty(events, cards),
+        'distractors': distractor_rates(events, cards, deck),
+        'chapter_accuracy': chapter_accuracy(events, cards),
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    for name, table in tables.items():
+        table.to_parquet(os.path.join(out_dir, f"{name}.parquet"), index=False)
+    return events, tables
+
+
+# --- Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate the answer event log into Parquet tables.")
+    parser.add_argument('--events', default=EVENT_LOG, help="Answer event log")
+    parser.add_argument('--deck', default=DATA_FILE, help="Flashcard CSV the events refer to")
+    parser.add_argument('--out', default=OUTPUT_DIR, help="Output directory for the Parquet files")
+    parser.add_argument('--top', type=int, default=5, help="Hardest cards and chapters to print")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    events, tables = run_analytics(args.events, args.deck, args.out)
+    print(f"Aggregated {len(events)} answer events in {time.perf_counter() - start:.2f}s into {args.out}/")
+    print("Hardest cards:")
+    for _, row in tables['card_difficulty'].head(args.top).iterrows():
+        print(f"  {row['accuracy']:6.1%} of {row['attempts']:>6} | {str(row['question'])[:70]}")
+    print("Weakest chapters:")
+    for _, row in tables['chapter_accuracy'].head(args.top).iterrows():
+        print(f"  {row['accuracy']:6.1%} of {row['attempts']:>6} | {row['chapter']}")
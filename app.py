@@ -1,151 +1,308 @@
 import streamlit as st
-import pandas as pd
+import concurrent.futures
+import json
+import os
 import random
+import time
+import tracemalloc
 import ast # For safely evaluating string representations if needed
-import hashlib
+from deck import DeckFormatError, select_card_ids
+from deck_watcher import DeckWatcher
+from event_log import EVENT_LOG, AnswerEventLog
+from quiz import QuizEngine
+from scheduler import REVIEW_DB, ReviewStore
+from sharded_deck import load_chapter_counts, load_deck
+from metrics import TIMINGS, MetricsExporter, RerunStats, collect_metrics, memory_snapshot
+from widget_state import card_widget_key, release_card_widgets
 
 # --- Configuration ---
 DATA_FILE = 'iot_flashcards_v2.csv' # Updated data file
-QUESTION_COL = 'Question'
-OPTIONS_COL = 'Options'
-ANSWER_COL = 'Correct Answer'
-CHAPTER_COL = 'Chapter' # New column
-MULTI_ANSWER_SEP = ';;' # Separator for multiple correct answers
+# Optional metric files, rewritten periodically (e.g. for a Prometheus textfile scraper)
+METRICS_JSONL = os.environ.get('FLASHCARDS_METRICS_JSONL')
+METRICS_PROM = os.environ.get('FLASHCARDS_METRICS_PROM')
+# Every submitted answer is appended here for analytics.py; set to an empty string to disable
+ANSWER_EVENTS = os.environ.get('FLASHCARDS_EVENT_LOG', EVENT_LOG)
+# For very large banks: store the deck as per-chapter shards and keep at most this many MB of
+# loaded chapters cached (see sharded_deck.py); unset loads the whole compiled deck
+SHARD_BUDGET_MB = float(os.environ.get('FLASHCARDS_SHARD_BUDGET_MB') or 0)
 
 # --- Load Data ---
-@st.cache_data # Cache the data loading to improve performance
+@st.cache_resource # One background load per process, shared by every session
+def get_deck_loader(file_path):
+    """Starts loading the deck on a background thread, so the page paints meanwhile.
+
+    Returns a Future of the deck; load_flashcards waits for it.
+    """
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='deck-loader')
+    future = executor.submit(load_deck_and_index, file_path)
+    executor.shutdown(wait=False) # The thread exits once the deck is loaded
+    return future
+
+def load_deck_and_index(file_path):
+    """The deck loader thread's job: the deck, then its search index (so typing never waits for it)."""
+    with TIMINGS.timer('load_flashcards'):
+        # The mapped compiled deck (rebuilt only when the CSV changed), or just the shard manifest
+        deck = load_deck(file_path, SHARD_BUDGET_MB)
+    with TIMINGS.timer('build_search_index'):
+        deck.search_index()
+    return deck
+
+@st.cache_resource # Chapter names and counts for the sidebar before the deck has loaded
+def get_chapter_counts(file_path):
+    """{chapter: card count} from the compiled deck header or shard manifest (None before the first build)."""
+    return load_chapter_counts(file_path, SHARD_BUDGET_MB)
+
+@st.cache_resource # One shared, read-only deck per process; sessions only hold card ids into it
 def load_flashcards(file_path):
-    """Loads flashcard data from the enhanced CSV file."""
+    """Waits for the background load of the flashcard deck and reports its errors."""
     try:
-        df = pd.read_csv(file_path)
-        # Check for required columns
-        required_cols = [CHAPTER_COL, QUESTION_COL, OPTIONS_COL, ANSWER_COL]
-        if not all(col in df.columns for col in required_cols):
-            st.error(f"CSV file must contain columns: {', '.join(required_cols)}")
-            return None
-
-        # Fill potential NaN values in critical columns to avoid errors
-        df[QUESTION_COL] = df[QUESTION_COL].fillna('')
-        df[OPTIONS_COL] = df[OPTIONS_COL].fillna('')
-        df[ANSWER_COL] = df[ANSWER_COL].fillna('')
-        df[CHAPTER_COL] = df[CHAPTER_COL].fillna('Unknown')
-
-        # Parse options string into a list, handling potential errors
-        def parse_options(options_str):
-            if pd.isna(options_str) or not isinstance(options_str, str):
-                return []
-            return [opt.strip() for opt in options_str.split('|')]
-        df[OPTIONS_COL] = df[OPTIONS_COL].apply(parse_options)
-
-        # Ensure Correct Answer is string
-        df[ANSWER_COL] = df[ANSWER_COL].astype(str)
-
-        # Basic validation: Check if correct answers exist within options
-        valid_rows = []
-        for index, row in df.iterrows():
-            options_set = set(row[OPTIONS_COL])
-            correct_answers_raw = row[ANSWER_COL]
-            is_multi = MULTI_ANSWER_SEP in correct_answers_raw
-            correct_answers_list = [ans.strip() for ans in correct_answers_raw.split(MULTI_ANSWER_SEP)] if is_multi else [correct_answers_raw.strip()]
-
-            # Check if all correct answers are present in the options list
-            if all(ans in options_set for ans in correct_answers_list if ans): # Check non-empty answers
-                 valid_rows.append(index)
-            # else:
-            #     print(f"Warning: Row {index} skipped. Correct answer(s) '{correct_answers_list}' not fully in options '{options_set}'.")
-
-
-        if len(valid_rows) < len(df):
-             print(f"Warning: Filtered out {len(df) - len(valid_rows)} rows due to mismatch between answers and options.")
-
-        df_filtered = df.loc[valid_rows].reset_index(drop=True)
-
-        if df_filtered.empty:
+        deck = get_deck_loader(file_path).result()
+
+        if len(deck) == 0:
              st.warning("No valid flashcards found after validation. Check CSV content.")
              return None
 
-        return df_filtered
+        return deck
 
     except FileNotFoundError:
         st.error(f"Error: The file '{file_path}' was not found.")
         return None
+    except DeckFormatError as e:
+        st.error(str(e))
+        return None
     except Exception as e:
         st.error(f"An error occurred while loading the data: {e}")
         return None
 
+@st.cache_resource # One review store (and writer thread) per process
+def get_review_store():
+    """Opens the SQLite store that persists spaced-repetition review state."""
+    return ReviewStore(REVIEW_DB)
+
+@st.cache_resource # One event log (and writer thread) per process
+def get_event_log():
+    """Opens the append-only log of answer events (None if disabled)."""
+    return AnswerEventLog(ANSWER_EVENTS) if ANSWER_EVENTS else None
+
+@st.cache_resource # The engine holds no per-session state, so all sessions share it
+def get_quiz_engine(file_path):
+    """Quiz backend over the shared deck (None if the deck could not be loaded)."""
+    deck = load_flashcards(file_path)
+    return QuizEngine(deck, get_review_store(), get_event_log()) if deck is not None else None
+
+@st.cache_resource # One watcher thread per process
+def get_deck_watcher(file_path):
+    """Reloads the deck in the background when the CSV changes (sessions follow it by card key)."""
+    engine = get_quiz_engine(file_path)
+    return DeckWatcher(file_path, engine, shard_budget_mb=SHARD_BUDGET_MB).start() if engine is not None else None
+
+@st.cache_resource # Counters shared by all sessions of this server process
+def get_rerun_stats():
+    """Counts script runs per answered card across sessions."""
+    return RerunStats()
+
+@st.cache_resource
+def get_metrics_exporter():
+    """Writes the process metrics to the files configured in the environment."""
+    return MetricsExporter(METRICS_JSONL, METRICS_PROM)
+
+def get_learner_id():
+    """Identifies whose reviews to load/save; set with ?learner=<name> in the URL."""
+    return st.query_params.get("learner", "local")
+
 # --- Helper Functions ---
-def reset_quiz_state(flashcards_df, selected_chapters):
-    """Resets the quiz state based on selected chapters."""
-    if flashcards_df is None or selected_chapters is None:
-        st.session_state.filtered_flashcards = pd.DataFrame()
-        st.session_state.shuffled_indices = []
+@TIMINGS.timer('reset_quiz_state')
+def reset_quiz_state(engine, selected_chapters, card_filter=None):
+    """Starts a new quiz session over the selected chapters (only the card_filter keys, if given)."""
+    if engine is None or selected_chapters is None:
+        st.session_state.quiz = None
     else:
-        # Filter based on selected chapters
-        st.session_state.filtered_flashcards = flashcards_df[flashcards_df[CHAPTER_COL].isin(selected_chapters)].reset_index(drop=True)
-
-        if not st.session_state.filtered_flashcards.empty:
-            # Create a shuffled list of indices for the filtered data
-            indices = list(range(len(st.session_state.filtered_flashcards)))
-            random.shuffle(indices)
-            st.session_state.shuffled_indices = indices
-        else:
-            st.session_state.shuffled_indices = []
-
-    # Reset progress
-    st.session_state.current_index = 0
-    st.session_state.user_answer = None
-    st.session_state.show_feedback = False
-    st.session_state.correct_count = 0
-    st.session_state.total_answered = 0
-    # Clear previous selections (important for multiselect)
-    st.session_state.current_selection = None
+        # Filtering, shuffling and the spaced-repetition schedule live in the QuizSession
+        st.session_state.quiz = engine.new_session(selected_chapters, get_learner_id(),
+                                                   spaced_repetition=st.session_state.get("spaced_repetition", False),
+                                                   card_filter=card_filter)
     # Clear randomized options for the new card/quiz
     st.session_state.current_randomized_options = None
+    st.session_state.submit_error = None
+    # Drop the widget state of the card that was on screen
+    release_card_widgets(st.session_state)
 
 
 # --- Initialize State ---
-def initialize_state(flashcards_df):
-    """Initializes Streamlit session state variables."""
-    if 'all_flashcards' not in st.session_state:
-         st.session_state.all_flashcards = flashcards_df # Store the original full dataframe
+def initialize_state(engine, chapter_counts=None):
+    """Initializes Streamlit session state variables.
+
+    engine is None while the deck is still loading; the chapters then come from chapter_counts.
+    """
+    if st.session_state.get('quiz_engine') is None:
+         st.session_state.quiz_engine = engine # The shared quiz engine (deck + review store)
+
+    if 'deck_version' not in st.session_state: # Deck version the chapter list below belongs to
+        st.session_state.deck_version = engine.deck_version if engine is not None else None
 
     if 'available_chapters' not in st.session_state:
-        if flashcards_df is not None:
-            st.session_state.available_chapters = sorted(flashcards_df[CHAPTER_COL].unique().tolist())
+        if engine is not None:
+            st.session_state.available_chapters = engine.chapters # Already sorted by the chapter index
         else:
-            st.session_state.available_chapters = []
-
-    # Initialize filter-dependent states if they don't exist
-    if 'filtered_flashcards' not in st.session_state:
-        st.session_state.filtered_flashcards = pd.DataFrame()
-    if 'shuffled_indices' not in st.session_state:
-        st.session_state.shuffled_indices = []
-    if 'current_index' not in st.session_state:
-        st.session_state.current_index = 0
-    if 'user_answer' not in st.session_state: # Stores the submitted answer(s)
-        st.session_state.user_answer = None
-    if 'show_feedback' not in st.session_state:
-        st.session_state.show_feedback = False
-    if 'correct_count' not in st.session_state:
-        st.session_state.correct_count = 0
-    if 'total_answered' not in st.session_state:
-        st.session_state.total_answered = 0
+            st.session_state.available_chapters = sorted(chapter_counts or [])
+
+    if 'quiz' not in st.session_state: # This session's QuizSession (progress, score, schedule)
+        st.session_state.quiz = None
     if 'selected_chapters' not in st.session_state:
-         st.session_state.selected_chapters = st.session_state.available_chapters # Default to all chapters
-    if 'current_selection' not in st.session_state: # Stores the current radio/multiselect choice before submission
-        st.session_state.current_selection = None
+        # Default to all chapters; with shards, to the first one, so a page load doesn't load every shard
+        available = st.session_state.available_chapters
+        st.session_state.selected_chapters = available[:1] if SHARD_BUDGET_MB else available
     if 'current_randomized_options' not in st.session_state: # Stores the shuffled options for the current card
         st.session_state.current_randomized_options = None
+    if 'submit_error' not in st.session_state: # Message for a rejected submit (e.g. nothing selected)
+        st.session_state.submit_error = None
+
+def sync_chapters(engine):
+    """Follows the chapter list of a reloaded deck (chapters may have been added or removed).
+
+    Also moves a session that started from the chapter manifest onto the loaded deck's chapters.
+    """
+    if engine is None or st.session_state.deck_version == engine.deck_version:
+        return
+    st.session_state.deck_version = engine.deck_version
+    st.session_state.available_chapters = engine.chapters
+    available = set(engine.chapters)
+    st.session_state.selected_chapters = [c for c in st.session_state.selected_chapters if c in available]
+    # The multiselect rejects values that are no longer options; recreate it from the default
+    if any(c not in available for c in st.session_state.get("chapter_select", [])):
+        del st.session_state.chapter_select
+
+
+# --- Callbacks ---
+# Widget callbacks run before the script, so every user action costs exactly one script run
+# instead of a run followed by st.rerun()
+def on_chapters_change():
+    """Applies a new chapter selection before the script renders it."""
+    # After a deck reload removed chapters, the widget reports a changed value although the
+    # learner chose nothing new; only chapters that still exist count
+    engine = st.session_state.quiz_engine
+    if engine is None: # Changed before the first run finished loading the deck
+        engine = st.session_state.quiz_engine = get_quiz_engine(DATA_FILE)
+    available = set(engine.chapters) if engine is not None else set()
+    selection = [c for c in st.session_state.chapter_select if c in available]
+    if set(selection) == {c for c in st.session_state.selected_chapters if c in available}:
+        return
+    st.session_state.selected_chapters = selection
+    reset_quiz_state(engine, st.session_state.selected_chapters)
+
+def on_mode_change():
+    """Switches the current quiz between shuffled and spaced-repetition order."""
+    if st.session_state.quiz is not None:
+        st.session_state.quiz.set_spaced_repetition(st.session_state.spaced_repetition)
+    st.session_state.current_randomized_options = None
+    release_card_widgets(st.session_state) # Switching modes leaves the current card
+
+def option_checkbox_key(option_index, card):
+    """Widget key of an option's checkbox (the card's stable key and the option's position)."""
+    return card_widget_key(st.session_state, card.key, f"cb_{option_index}")
+
+def submit_answer(card, radio_key, checkbox_keys):
+    """Reads the answer from the submitted form as an option bitmask and grades it.
+
+    checkbox_keys: (option index, widget key) pairs of a multi-answer card, in display order.
+    """
+    if card.is_multi:
+        selection = 0
+        for option_index, key in checkbox_keys:
+            if st.session_state.get(key, False):
+                selection |= 1 << option_index
+        if not selection:
+            st.session_state.submit_error = "Select at least one option before submitting."
+            return
+    else:
+        option_index = st.session_state.get(radio_key)
+        selection = 0 if option_index is None else 1 << option_index
+
+    st.session_state.submit_error = None
+    # Grades, scores and schedules the card (and queues the review for the store)
+    st.session_state.quiz.submit(selection)
+    get_rerun_stats().record_answer()
+
+def next_card():
+    """Moves on to the next card."""
+    st.session_state.quiz.next()
+    st.session_state.current_randomized_options = None # Clear shuffled options for next card
+    # Drop the radio/checkbox state of the card being left (only its own registered keys)
+    release_card_widgets(st.session_state)
+
+def restart_quiz():
+    # A quiz over search results restarts over the same results
+    reset_quiz_state(st.session_state.quiz_engine, st.session_state.selected_chapters, st.session_state.quiz.card_filter)
+
+def search_cards(engine, query, selected_chapters):
+    """Deck positions of the cards in the selected chapters that match the query (None if search
+    is unavailable or the query is empty)."""
+    index = engine.deck.search_index() # Built by the deck loader; lazily after a reload
+    if index is None or not query:
+        return None
+    with TIMINGS.timer('search'):
+        return index.search(query, within=select_card_ids(engine.deck, selected_chapters))
+
+def start_search_quiz():
+    """Starts a quiz over the cards the search box currently matches."""
+    engine = st.session_state.quiz_engine
+    matches = search_cards(engine, st.session_state.search_query, st.session_state.selected_chapters)
+    if matches is not None:
+        reset_quiz_state(engine, st.session_state.selected_chapters, engine.deck.card_keys[matches])
+
+def end_search_quiz():
+    reset_quiz_state(st.session_state.quiz_engine, st.session_state.selected_chapters)
+
+
+# --- Debug Panel ---
+def render_debug_panel():
+    """Sidebar panel with section latencies, rerun counts and traced memory (?debug=1)."""
+    rerun_stats = get_rerun_stats()
+    exporter = get_metrics_exporter()
+    with st.sidebar.expander("Performance", expanded=True):
+        st.caption(rerun_stats.summary())
+        rows = [{"section": name, "count": stats["count"], "p50 (ms)": round(stats["p50"] * 1e3, 2),
+                 "p95 (ms)": round(stats["p95"] * 1e3, 2), "max (ms)": round(stats["max"] * 1e3, 2)}
+                for name, stats in TIMINGS.summary().items()]
+        if rows:
+            st.table(rows)
+        engine = st.session_state.get('quiz_engine')
+        if engine is not None and hasattr(engine.deck, 'cache_info'): # Chapter-sharded deck
+            cache = engine.deck.cache_info()
+            st.caption(f"Shard cache: {cache['chapters']} chapters, {cache['bytes'] / 1e6:.1f} of {cache['budget'] / 1e6:.0f} MB, "
+                       f"{cache['hits']} hits, {cache['misses']} misses, {cache['evictions']} evictions")
+
+        # Tracing is process-wide and slows every session down, so it is opt-in
+        trace_memory = st.checkbox("Trace memory (tracemalloc)", value=tracemalloc.is_tracing(), key="debug_trace_memory")
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        memory = memory_snapshot()
+        if memory:
+            st.caption(f"Traced memory: {memory['current'] / 1e6:.1f} MB (peak {memory['peak'] / 1e6:.1f} MB)")
+            st.table([{"site": top["site"], "KB": round(top["size"] / 1024, 1), "blocks": top["count"]} for top in memory["top"]])
+
+        st.download_button("Download metrics (JSON)", json.dumps(collect_metrics(rerun_stats=rerun_stats, memory=memory)),
+                           file_name="flashcards_metrics.json", mime="application/json")
+        st.button("Write metrics files", disabled=not exporter.enabled, on_click=exporter.export, args=(rerun_stats,),
+                  help="Set FLASHCARDS_METRICS_JSONL and/or FLASHCARDS_METRICS_PROM to enable")
 
 
 # --- Main App Logic ---
 st.set_page_config(layout="wide")
 st.title("🧠 IoT Flashcard Quiz")
+get_rerun_stats().record_run()
+script_start = time.perf_counter()
 
-# Load data once
-all_flashcards_df = load_flashcards(DATA_FILE)
+# Load data once: the deck loads on a background thread while the sidebar is painted from
+# the chapter counts in the compiled deck header; the quiz area below waits for the deck
+deck_loader = get_deck_loader(DATA_FILE)
+chapter_counts = get_chapter_counts(DATA_FILE)
+quiz_engine = get_quiz_engine(DATA_FILE) if chapter_counts is None or deck_loader.done() else None
 
-initialize_state(all_flashcards_df)
+initialize_state(quiz_engine, chapter_counts)
+sync_chapters(quiz_engine)
 
 # --- Sidebar for Chapter Selection ---
 st.sidebar.header("Chapters")
@@ -153,7 +310,10 @@ selected_chapters = st.sidebar.multiselect(
     "Select chapters to study:",
     options=st.session_state.available_chapters,
     default=st.session_state.selected_chapters,
-    key="chapter_select"
+    # Per-chapter card counts come from the chapter index (or shard manifest), no deck scan needed
+    format_func=lambda chapter: f"{chapter} ({(quiz_engine.deck.chapter_counts if quiz_engine is not None else chapter_counts or {}).get(chapter, 0)})",
+    key="chapter_select",
+    on_change=on_chapters_change, # Resets the quiz before this run renders the new filter
 )
 
 st.sidebar.header("Options")
@@ -162,231 +322,170 @@ randomize_options = st.sidebar.checkbox(
     value=False,
     key="randomize_options"
 )
+spaced_repetition = st.sidebar.checkbox(
+    "Spaced Repetition (due cards first)",
+    value=False,
+    key="spaced_repetition",
+    on_change=on_mode_change,
+)
 
-# Detect if chapter selection changed
-chapters_changed = False
-if 'selected_chapters' in st.session_state and set(selected_chapters) != set(st.session_state.selected_chapters):
-    chapters_changed = True
-    st.session_state.selected_chapters = selected_chapters
-
-# Reset quiz if chapters changed or if it's the first run with chapters selected
-if chapters_changed or ('filtered_flashcards' not in st.session_state or st.session_state.filtered_flashcards.empty) and selected_chapters:
-     reset_quiz_state(st.session_state.all_flashcards, selected_chapters)
-     st.rerun() # Rerun to apply the new filter immediately
+# The sidebar is on screen; wait for the deck before the first card
+if quiz_engine is None:
+    with st.spinner("Loading flashcards..."):
+        quiz_engine = get_quiz_engine(DATA_FILE)
+    initialize_state(quiz_engine)
+    sync_chapters(quiz_engine)
+get_deck_watcher(DATA_FILE)
+
+# --- Sidebar Search ---
+if quiz_engine is not None and quiz_engine.deck.search_index() is not None:
+    st.sidebar.header("Search")
+    query = st.sidebar.text_input("Find cards by text (word prefixes):", key="search_query", placeholder="e.g. mqtt brok")
+    matches = search_cards(quiz_engine, query, selected_chapters)
+    if matches is not None:
+        st.sidebar.caption(f"{len(matches)} matching cards in the selected chapters")
+        for position in matches[:5].tolist():
+            st.sidebar.caption(f"• {quiz_engine.deck.cards[position].question[:90]}")
+        st.sidebar.button(f"Quiz these {len(matches)} cards", key="search_quiz", on_click=start_search_quiz,
+                          disabled=len(matches) == 0)
+    quiz = st.session_state.quiz
+    if quiz is not None and quiz.card_filter is not None:
+        st.sidebar.info(f"Quizzing {len(quiz)} search results.")
+        st.sidebar.button("Back to all cards in the selected chapters", key="end_search_quiz", on_click=end_search_quiz)
+
+# First run with chapters selected: build the quiz in this same run
+if selected_chapters and st.session_state.quiz is None:
+     reset_quiz_state(st.session_state.quiz_engine, selected_chapters)
 
 
 # --- Main Quiz Area ---
-filtered_df = st.session_state.filtered_flashcards
-
-if filtered_df is not None and not filtered_df.empty:
-    num_cards = len(filtered_df)
-    shuffled_indices = st.session_state.shuffled_indices
-    current_shuffled_list_index = st.session_state.current_index
-
-    if not shuffled_indices:
-         st.warning("No flashcards available for the selected chapters.")
-    elif current_shuffled_list_index < len(shuffled_indices):
-        actual_card_index = shuffled_indices[current_shuffled_list_index]
-        card = filtered_df.iloc[actual_card_index]
-
-        st.subheader(f"Card {current_shuffled_list_index + 1} of {num_cards} (Selected Chapters)")
-        st.markdown(f"**Chapter:** {card[CHAPTER_COL]}")
-        st.markdown(f"**Question:**\n> {card[QUESTION_COL]}")
-
-        options = card[OPTIONS_COL]
-        correct_answers_raw = card[ANSWER_COL]
-        is_multi_select = MULTI_ANSWER_SEP in correct_answers_raw
-        correct_answers_set = set(ans.strip() for ans in correct_answers_raw.split(MULTI_ANSWER_SEP)) if is_multi_select else {correct_answers_raw.strip()}
-
-        # Determine the options to display (original or randomized)
-        display_options = options # Default to original order
-        if st.session_state.randomize_options:
-            if st.session_state.current_randomized_options is None:
-                # Shuffle only if not already shuffled for this card
-                shuffled_options = options[:] # Create a copy
-                random.shuffle(shuffled_options)
-                st.session_state.current_randomized_options = shuffled_options
-            # Use the stored shuffled options if they exist
-            if st.session_state.current_randomized_options:
-                 display_options = st.session_state.current_randomized_options
-        else:
-             # If randomization is turned off, ensure we clear any stored random options
-             st.session_state.current_randomized_options = None
-
-
-        # --- Input Widget (Radio or Multiselect) ---
-        answer_key = f"answer_{actual_card_index}"
-        widget_key = f"input_{actual_card_index}" # Unique key per card
-        if is_multi_select:
-            st.info("This question may have multiple correct answers.")
-            # Initialize current selection list if it doesn't exist
-            if not isinstance(st.session_state.current_selection, list):
-                st.session_state.current_selection = []
-            
-            # Create a callback function for each option that directly manages the selection state
-            def create_checkbox_callback(opt, widget_key):
-                # Create a unique hash for the option string
-                option_hash = hashlib.md5(opt.encode()).hexdigest()
-                checkbox_key = f"cb_{option_hash}_{widget_key}"
-
-                # Define what happens when this specific checkbox changes
-                def on_change():
-                    # Safely get the checkbox state, defaulting to False if the key doesn't exist yet
-                    is_checked = st.session_state.get(checkbox_key, False)
-                    # Make a copy of the current selection to avoid reference issues
-                    current = list(st.session_state.current_selection) if isinstance(st.session_state.current_selection, list) else []
-
-                    if is_checked and opt not in current:
-                        current.append(opt)
-                    elif not is_checked and opt in current:
-                        current.remove(opt)
-
-                    st.session_state.current_selection = current
-
-                return checkbox_key, on_change
-
-            # Display each option as a checkbox with its own callback
-            for option in display_options: # Use the potentially shuffled options
-                checkbox_key, callback_fn = create_checkbox_callback(option, widget_key)
-                # Check selection against the potentially shuffled list
-                is_selected = isinstance(st.session_state.current_selection, list) and option in st.session_state.current_selection
-
-                st.checkbox(
-                    option,
-                    value=is_selected,
-                    key=checkbox_key,
-                    disabled=st.session_state.show_feedback,
-                    on_change=callback_fn,
-                )
-        else:
-            # Radio buttons for single select with improved change detection
-            radio_key = f"radio_{actual_card_index}"
-            
-            # Initialize radio_changed flag in session state if not exists
-            if f"prev_selection_{actual_card_index}" not in st.session_state:
-                st.session_state[f"prev_selection_{actual_card_index}"] = None
-            
-            # For single-option questions, auto-select it
-            if len(display_options) == 1: # Use display_options
-                # If there's only one option, auto-select it
-                st.session_state.current_selection = display_options[0]
-                st.radio(
-                    "Choose your answer (auto-selected as there's only one option):",
-                    display_options, # Use display_options
-                    index=0,
-                    key=radio_key,
-                    disabled=st.session_state.show_feedback
-                )
-                # Make sure we also update the previous selection tracker
-                st.session_state[f"prev_selection_{actual_card_index}"] = options[0]
-            else:
-                # Calculate default index for the radio button using display_options
-                try:
-                    # Ensure current_selection is valid within the potentially shuffled list
-                    default_index = display_options.index(st.session_state.current_selection) if st.session_state.current_selection in display_options else 0
-                except (ValueError, IndexError):
-                    default_index = 0 # Default to first option if current selection isn't found (e.g., after reshuffle)
-
-                # Display the radio button
-                selected_option = st.radio(
-                    "Choose your answer:",
-                    display_options, # Use display_options
-                    index=default_index,
-                    key=radio_key,
-                    disabled=st.session_state.show_feedback
-                )
-                
-                # Check if selection has changed and update
-                if selected_option != st.session_state[f"prev_selection_{actual_card_index}"]:
-                    # Store the new selection in regular current_selection
-                    st.session_state.current_selection = selected_option
-                    # Update the previous selection tracker
-                    st.session_state[f"prev_selection_{actual_card_index}"] = selected_option
-                    
-                    # Only rerun if this isn't the initial load
-                    if st.session_state[f"prev_selection_{actual_card_index}"] is not None:
-                        st.rerun()
-
-        # --- Buttons and Feedback Logic ---
-        col1, col2 = st.columns([1, 5])
-
-        # Display either Submit Answer or Next Card button based on feedback state
-        with col1:
-            if not st.session_state.show_feedback:
-                # Only show Submit Answer when feedback is not shown
-                # For radio buttons, we always have a selection (the first option by default)
-                # For checkboxes, only disable if there's no selection
-                if is_multi_select:
-                    submit_disabled = not st.session_state.current_selection or len(st.session_state.current_selection) == 0
-                else:
-                    # For radio buttons, always enable since there's always a selection
-                    submit_disabled = False
-                
-                submit_button = st.button("Submit Answer", key=f"submit_{actual_card_index}", disabled=submit_disabled)
+quiz = st.session_state.quiz
+
+if quiz is not None and not quiz.empty:
+    # The card to show: the next shuffled card, or the scheduler's pick in spaced-repetition mode
+    actual_card_index = quiz.current_position()
+    num_cards = len(quiz)
+
+    if actual_card_index is not None:
+        with TIMINGS.timer('render_card'):
+            card = quiz.card(actual_card_index)
+            result = quiz.last_result # Set once this card's answer is submitted
+
+            if quiz.spaced_repetition:
+                st.subheader(f"Review ({quiz.new_remaining()} new cards left in Selected Chapters)")
             else:
-                # Show Next Card button when feedback is shown (replacing Submit Answer)
-                if st.button("Next Card", key=f"next_{actual_card_index}"):
-                    st.session_state.current_index += 1
-                    st.session_state.user_answer = None
-                    st.session_state.show_feedback = False
-                    st.session_state.current_selection = None
-                    st.session_state.current_randomized_options = None # Clear shuffled options for next card
-                    # Clear checkbox-related keys
-                    for key in st.session_state.keys():
-                        if key.startswith("cb_"):
-                            del st.session_state[key]
-                    st.rerun()  # Force rerun to update the page immediately
-
-        if not st.session_state.show_feedback and submit_button:
-            st.session_state.user_answer = st.session_state.current_selection
-            st.session_state.show_feedback = True
-            st.session_state.total_answered += 1
-
-            # Check correctness
-            user_answers_set = set(st.session_state.current_selection) if isinstance(st.session_state.current_selection, list) else {st.session_state.current_selection}
-            if user_answers_set == correct_answers_set:
-                st.session_state.correct_count += 1
-            
-            # Force rerun to update UI (hide Submit button, show Next Card button)
-            st.rerun()
-
-        if st.session_state.show_feedback:
-            user_answer = st.session_state.user_answer
-            # Handle potential None or unusual values in user_answer
-            if user_answer is None:
-                user_answers_set = set()
+                st.subheader(f"Card {quiz.index + 1} of {num_cards} ({'Search Results' if quiz.card_filter is not None else 'Selected Chapters'})")
+
+            st.markdown(f"**Chapter:** {card.chapter}")
+            st.markdown(f"**Question:**\n> {card.question}")
+
+            # Options and answers were split when the deck was loaded
+            options = card.options
+            is_multi_select = card.is_multi
+            correct_answers_set = card.answers
+
+            # Determine the options to display (original or randomized), as option indices
+            display_options = range(len(options)) # Default to original order
+            if st.session_state.randomize_options:
+                if st.session_state.current_randomized_options is None:
+                    # Shuffle only if not already shuffled for this card
+                    shuffled_options = list(display_options)
+                    random.shuffle(shuffled_options)
+                    st.session_state.current_randomized_options = shuffled_options
+                # Use the stored shuffled options if they exist
+                if st.session_state.current_randomized_options:
+                     display_options = st.session_state.current_randomized_options
             else:
-                user_answers_set = set(user_answer) if isinstance(user_answer, list) else {user_answer}
+                 # If randomization is turned off, ensure we clear any stored random options
+                 st.session_state.current_randomized_options = None
 
-            is_correct = (user_answers_set == correct_answers_set)
-            correct_answer_display = ", ".join(sorted(list(correct_answers_set)))
 
-            if is_correct:
-                st.success(f"Correct! 🎉 The answer is: **{correct_answer_display}**")
-            else:
-                # Safely convert user_answers_set to a display string
-                if user_answers_set:
-                    # Convert all elements to strings before sorting to avoid type errors
-                    chosen_display = ", ".join(sorted(str(ans) for ans in user_answers_set))
+            # --- Answer Form (Radio or Checkboxes) ---
+            # Inside a form, choosing options doesn't run the script; only Submit does
+            radio_key = None
+            checkbox_keys = []
+            with st.form(key=f"form_{card.key}", border=False):
+                if is_multi_select:
+                    st.info("This question may have multiple correct answers.")
+                    # One checkbox per option; submit_answer collects the checked ones into a bitmask
+                    for option_index in display_options: # Use the potentially shuffled options
+                        checkbox_key = option_checkbox_key(option_index, card)
+                        checkbox_keys.append((option_index, checkbox_key))
+                        st.checkbox(
+                            options[option_index],
+                            key=checkbox_key,
+                            disabled=result is not None,
+                        )
                 else:
-                    chosen_display = "No answer provided"
-                st.error(f"Incorrect. 😥 You chose: **{chosen_display}**. The correct answer is: **{correct_answer_display}**")
+                    radio_key = card_widget_key(st.session_state, card.key, "radio")
+                    # For single-option questions the only option is preselected
+                    label = "Choose your answer (auto-selected as there's only one option):" if len(display_options) == 1 else "Choose your answer:"
+                    st.radio(
+                        label,
+                        display_options, # Use display_options; the value is the option index
+                        index=0,
+                        format_func=options.__getitem__,
+                        key=radio_key,
+                        disabled=result is not None
+                    )
+
+                # Grading happens in the callback, so this click's single run already shows the feedback
+                st.form_submit_button(
+                    "Submit Answer",
+                    disabled=result is not None,
+                    on_click=submit_answer,
+                    args=(card, radio_key, checkbox_keys),
+                )
+
+            if st.session_state.submit_error and result is None:
+                st.warning(st.session_state.submit_error)
 
-        # Display Score in Sidebar
+            # --- Feedback Logic ---
+            if result is not None:
+                user_answers_set = result.selected
+                is_correct = result.is_correct
+                correct_answer_display = ", ".join(sorted(list(correct_answers_set)))
+
+                if is_correct:
+                    st.success(f"Correct! 🎉 The answer is: **{correct_answer_display}**")
+                else:
+                    # Safely convert user_answers_set to a display string
+                    if user_answers_set:
+                        # Convert all elements to strings before sorting to avoid type errors
+                        chosen_display = ", ".join(sorted(str(ans) for ans in user_answers_set))
+                    else:
+                        chosen_display = "No answer provided"
+                    st.error(f"Incorrect. 😥 You chose: **{chosen_display}**. The correct answer is: **{correct_answer_display}**")
+
+                st.button("Next Card", key=f"next_{actual_card_index}", on_click=next_card)
+
+            # Display Score in Sidebar
+            st.sidebar.header("Score")
+            st.sidebar.metric("Correct Answers", f"{quiz.correct_count} / {quiz.total_answered}")
+
+    elif quiz.spaced_repetition:
+        next_due = quiz.next_due_time()
+        when = time.strftime('%Y-%m-%d %H:%M', time.localtime(next_due)) if next_due else "not scheduled"
+        st.success(f"✅ All caught up! No cards are due in the selected chapters. Next review: **{when}**")
         st.sidebar.header("Score")
-        st.sidebar.metric("Correct Answers", f"{st.session_state.correct_count} / {st.session_state.total_answered}")
+        st.sidebar.metric("Correct Answers", f"{quiz.correct_count} / {quiz.total_answered}")
+        st.button("Check Again") # The scheduler is asked again on every run
 
-    elif filtered_df is not None and not filtered_df.empty:
+    else:
         st.success("🎉 You've completed all the flashcards for the selected chapters!")
         st.balloons()
-        st.metric("Final Score (Selected Chapters)", f"{st.session_state.correct_count} / {num_cards}")
-        if st.button("Restart Quiz (Same Chapters)"):
-            reset_quiz_state(st.session_state.all_flashcards, st.session_state.selected_chapters)
-            st.rerun()  # Force rerun to update the page immediately
+        st.metric("Final Score (Selected Chapters)", f"{quiz.correct_count} / {num_cards}")
+        st.button("Restart Quiz (Same Chapters)", on_click=restart_quiz)
 
 elif not selected_chapters:
     st.warning("Please select at least one chapter from the sidebar to start the quiz.")
-elif all_flashcards_df is None:
+elif quiz_engine is None:
     st.error("Could not load flashcards. Please check the data file 'iot_flashcards_v2.csv' and ensure it's in the correct format.")
 else:
     st.warning("No flashcards found for the selected chapters in 'iot_flashcards_v2.csv'.")
+
+# --- Instrumentation ---
+TIMINGS.record('script_run', time.perf_counter() - script_start)
+get_metrics_exporter().maybe_export(get_rerun_stats())
+if st.query_params.get("debug") == "1":
+    render_debug_panel()
@@ -0,0 +1,51 @@
+# benchmarks/bench_analytics.py
+# Time for analytics.py to aggregate a large answer event log into its Parquet tables.
+# Usage: python benchmarks/bench_analytics.py [--rows 100000] [--events 5000000]
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from generators import make_synthetic_deck, make_synthetic_events
+from analytics import run_analytics
+from compiled_deck import load_compiled_deck
+from event_log import EVENT_DTYPE, read_events
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the answer event analytics.')
+    parser.add_argument('--rows', type=int, default=100_000, help="Cards in the synthetic deck")
+    parser.add_argument('--events', type=int, default=5_000_000, help="Answer events in the log")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'deck.csv')
+        events_path = os.path.join(tmp, 'answers.events')
+        make_synthetic_deck(args.rows).to_csv(csv_path, index=False)
+        with contextlib.redirect_stdout(io.StringIO()): # Validation warnings
+            deck = load_compiled_deck(csv_path).to_deck()
+        make_synthetic_events(events_path, deck, args.events)
+
+        start = time.perf_counter()
+        read_events(events_path)
+        read_time = time.perf_counter() - start
+        start = time.perf_counter()
+        _, tables = run_analytics(events_path, csv_path, os.path.join(tmp, 'out'))
+        total_time = time.perf_counter() - start
+        parquet_bytes = sum(entry.stat().st_size for entry in os.scandir(os.path.join(tmp, 'out')))
+
+    print(f"{args.events} events over {len(deck)} cards ({args.events * EVENT_DTYPE.itemsize / 1e6:.0f} MB log)")
+    print(f"  read log:       {read_time:8.3f} s")
+    print(f"  run_analytics:  {total_time:8.3f} s ({args.events / total_time / 1e6:.1f}M events/s, incl. deck load)")
+    for name, table in tables.items():
+        print(f"  {name:<17} {len(table):>8} rows")
+    print(f"  Parquet output: {parquet_bytes / 1e6:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
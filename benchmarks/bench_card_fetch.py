@@ -0,0 +1,84 @@
+# benchmarks/bench_card_fetch.py
+# Per-rerun cost of fetching the current card: a pandas row (iloc) plus re-splitting the
+# answers, as the app used to do, vs reading a prebuilt Card record. Optionally also times
+# whole script reruns of app.py through Streamlit's AppTest.
+# Usage: python benchmarks/bench_card_fetch.py [--rows 100000] [--fetches 20000] [--app-reruns 20]
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from generators import make_synthetic_deck
+from deck import (
+    ANSWER_COL, CHAPTER_COL, MULTI_ANSWER_SEP, OPTIONS_COL, QUESTION_COL,
+    Deck, build_cards, prepare_flashcards, validate_flashcards,
+)
+
+
+def fetch_row(frame, position):
+    """The old render path: build a Series for the row and split the answer cell."""
+    card = frame.iloc[position]
+    chapter, question, options = card[CHAPTER_COL], card[QUESTION_COL], card[OPTIONS_COL]
+    correct_answers_raw = card[ANSWER_COL]
+    is_multi_select = MULTI_ANSWER_SEP in correct_answers_raw
+    answers = set(ans.strip() for ans in correct_answers_raw.split(MULTI_ANSWER_SEP)) if is_multi_select else {correct_answers_raw.strip()}
+    return chapter, question, options, is_multi_select, answers
+
+
+def fetch_card(cards, position):
+    """The new render path: attribute access on a prebuilt Card."""
+    card = cards[position]
+    return card.chapter, card.question, card.options, card.is_multi, card.answers
+
+
+def time_per_call(fn, positions):
+    start = time.perf_counter()
+    for position in positions:
+        fn(position)
+    return (time.perf_counter() - start) / len(positions)
+
+
+def time_app_reruns(reruns):
+    """Mean wall time of a full app.py script run (card already on screen)."""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(ROOT, 'app.py'), default_timeout=120).run()
+    start = time.perf_counter()
+    for _ in range(reruns):
+        at.run()
+    return (time.perf_counter() - start) / reruns
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-rerun card fetch cost.')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--fetches', type=int, default=20_000)
+    parser.add_argument('--app-reruns', type=int, default=0, help="Also time N full reruns of app.py")
+    args = parser.parse_args()
+
+    frame, _ = validate_flashcards(prepare_flashcards(make_synthetic_deck(args.rows)))
+    start = time.perf_counter()
+    deck = Deck(frame)
+    cards_time = time.perf_counter() - start # Includes the chapter index and card keys
+    start = time.perf_counter()
+    build_cards(frame, deck.card_keys)
+    build_time = time.perf_counter() - start
+
+    rng = random.Random(0)
+    positions = [rng.randrange(len(frame)) for _ in range(args.fetches)]
+    assert all(fetch_row(frame, p)[4] == fetch_card(deck.cards, p)[4] for p in positions[:1000])
+
+    row_time = time_per_call(lambda p: fetch_row(frame, p), positions)
+    card_time = time_per_call(lambda p: fetch_card(deck.cards, p), positions)
+    print(f"{len(frame)} cards")
+    print(f"  Deck() incl. cards:     {cards_time:8.3f} s (build_cards alone {build_time:.3f} s, once per process)")
+    print(f"  iloc row + split:       {row_time * 1e6:8.1f} us/rerun")
+    print(f"  Card attributes:        {card_time * 1e6:8.2f} us/rerun ({row_time / card_time:.0f}x faster)")
+    if args.app_reruns:
+        print(f"  full app.py rerun:      {time_app_reruns(args.app_reruns) * 1e3:8.1f} ms (bundled deck)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# benchmarks/bench_chapter_filter.py
+# Cost of a chapter filter change: scanning the deck with isin() vs the precomputed ChapterIndex.
+# Usage: python benchmarks/bench_chapter_filter.py [--sizes 1000 100000 1000000] [--chapters 48]
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from generators import make_synthetic_deck
+from deck import CHAPTER_COL, Deck, prepare_flashcards, select_card_ids, validate_flashcards
+
+
+def best_of(fn, repeats=20):
+    """Best wall time of `repeats` calls, in milliseconds."""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark chapter filter switching.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    parser.add_argument('--chapters', type=int, default=48)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'deck rows':>10} {'index build (ms)':>17} {'isin scan (ms)':>15} {'index union (ms)':>17}")
+    for num_rows in args.sizes:
+        frame, _ = validate_flashcards(prepare_flashcards(make_synthetic_deck(num_rows, num_chapters=args.chapters)))
+        start = time.perf_counter()
+        deck = Deck(frame)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        # A typical sidebar change: a few chapters of a large multi-subject bank
+        selected = rng.sample(deck.chapters, 3)
+        expected = np.flatnonzero(frame[CHAPTER_COL].isin(selected).to_numpy())
+        assert np.array_equal(np.sort(select_card_ids(deck, selected)), expected)
+
+        scan_ms = best_of(lambda: np.flatnonzero(frame[CHAPTER_COL].isin(selected).to_numpy()))
+        index_ms = best_of(lambda: select_card_ids(deck, selected))
+        print(f"{num_rows:>10} {build_ms:>17.2f} {scan_ms:>15.3f} {index_ms:>17.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# benchmarks/bench_compiled_deck.py
+# Startup cost of parsing the CSV (read_flashcards) vs mapping a compiled .deck file.
+# Usage: python benchmarks/bench_compiled_deck.py [--sizes 1000 100000]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from generators import make_synthetic_deck
+from compiled_deck import compile_deck, load_compiled_deck
+from deck import read_flashcards
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark CSV parsing vs compiled deck loading.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'csv parse (s)':>14} {'compile (s)':>12} {'mmap open (s)':>14} {'to_frame (s)':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for num_rows in args.sizes:
+            csv_path = os.path.join(tmp, f"deck_{num_rows}.csv")
+            make_synthetic_deck(num_rows).to_csv(csv_path, index=False)
+
+            start = time.perf_counter()
+            read_flashcards(csv_path)
+            parse_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            compile_deck(csv_path)
+            compile_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            deck = load_compiled_deck(csv_path) # Fresh: mmap + header only
+            open_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            deck.to_frame()
+            frame_time = time.perf_counter() - start
+            print(f"{num_rows:>10} {parse_time:>14.3f} {compile_time:>12.3f} {open_time:>14.4f} {frame_time:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
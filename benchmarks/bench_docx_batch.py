@@ -0,0 +1,42 @@
+# benchmarks/bench_docx_batch.py
+# Batch conversion throughput of process_docx_highlight.convert_batch by worker count.
+# Usage: python benchmarks/bench_docx_batch.py [--files 8] [--questions 500] [--workers 1 2 4]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from generators import make_synthetic_docx
+from process_docx_highlight import convert_batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parallel DOCX batch conversion.')
+    parser.add_argument('--files', type=int, default=8)
+    parser.add_argument('--questions', type=int, default=500, help="Questions per generated bank")
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, 2, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_paths = []
+        for i in range(args.files):
+            path = os.path.join(tmp, f"bank_{i}.docx")
+            make_synthetic_docx(path, args.questions, seed=i)
+            file_paths.append(path)
+
+        print(f"{args.files} banks x {args.questions} questions, {os.cpu_count()} CPU(s)")
+        print(f"{'workers':>8} {'wall (s)':>9} {'files/s':>8} {'speedup':>8}")
+        base = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            cards = sum(len(result.df) for result in convert_batch(file_paths, workers))
+            elapsed = time.perf_counter() - start
+            base = base or elapsed
+            assert cards == args.files * args.questions
+            print(f"{workers:>8} {elapsed:>9.2f} {args.files / elapsed:>8.1f} {base / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# benchmarks/bench_docx_stream.py
+# Time and peak memory of parse_docx with python-docx vs the streaming (iterparse) reader.
+# Each mode runs in a fresh subprocess so its peak RSS is measured in isolation.
+# Usage: python benchmarks/bench_docx_stream.py [--questions 5000]
+import argparse
+import hashlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from generators import make_synthetic_docx
+
+
+def run_child(docx_path, streaming):
+    """Child process body: parse once, report time, peak RSS and an output digest as JSON."""
+    import contextlib
+    import io
+    from process_docx_highlight import parse_docx
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = parse_docx(docx_path, streaming=streaming)
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    digest = hashlib.sha256(df.to_csv(index=False).encode('utf-8')).hexdigest()
+    print(json.dumps({'seconds': elapsed, 'peak_mb': peak_kb / 1024, 'parse_mb': (peak_kb - baseline_kb) / 1024,
+                      'cards': len(df), 'digest': digest}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark python-docx vs streaming DOCX parsing.')
+    parser.add_argument('--questions', type=int, default=5000)
+    parser.add_argument('--child', nargs=2, metavar=('DOCX', 'MODE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], args.child[1] == 'stream')
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        docx_path = os.path.join(tmp, 'bank.docx')
+        make_synthetic_docx(docx_path, args.questions)
+        print(f"{args.questions} questions, {os.path.getsize(docx_path) / 1e6:.1f} MB docx")
+        print(f"{'mode':>12} {'time (s)':>9} {'peak RSS (MB)':>14} {'parse delta (MB)':>17} {'cards':>6}")
+        digests = set()
+        for mode in ('python-docx', 'stream'):
+            output = subprocess.run([sys.executable, __file__, '--child', docx_path, mode],
+                                    check=True, capture_output=True, text=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            digests.add(result['digest'])
+            print(f"{mode:>12} {result['seconds']:>9.2f} {result['peak_mb']:>14.1f} {result['parse_mb']:>17.1f} {result['cards']:>6}")
+        print("outputs identical" if len(digests) == 1 else "OUTPUTS DIFFER")
+
+
+if __name__ == "__main__":
+    main()
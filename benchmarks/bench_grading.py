@@ -0,0 +1,69 @@
+# benchmarks/bench_grading.py
+# Per-answer cost of building the option widget keys and grading a submission: an MD5 of
+# every option string plus string-set equality, as the app used to do, vs keys from the
+# card's stable key and option positions plus one bitmask comparison.
+# Usage: python benchmarks/bench_grading.py [--rows 100000] [--answers 20000]
+import argparse
+import hashlib
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from generators import make_synthetic_deck
+from deck import Deck, build_cards, prepare_flashcards, validate_flashcards
+
+
+def grade_strings(card, selection, position):
+    """The old path: hashed checkbox keys, then string-set equality."""
+    keys = [f"card:{position}:cb_{hashlib.md5(opt.encode()).hexdigest()}" for opt in card.options]
+    return keys, set(selection) == set(card.answers)
+
+
+def grade_mask(card, mask, position):
+    """The new path: keys from precomputed ids, then an int comparison."""
+    keys = [f"card:{card.key}:cb_{i}" for i in range(len(card.options))]
+    return keys, mask == card.answer_mask
+
+
+def time_per_call(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(*item)
+    return (time.perf_counter() - start) / len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark widget keys + grading per answer.')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--answers', type=int, default=20_000)
+    args = parser.parse_args()
+
+    frame, _ = validate_flashcards(prepare_flashcards(make_synthetic_deck(args.rows)))
+    deck = Deck(frame)
+    start = time.perf_counter()
+    build_cards(frame, deck.card_keys) # Now includes each card's answer mask
+    build_time = time.perf_counter() - start
+
+    rng = random.Random(0)
+    samples = []
+    for _ in range(args.answers):
+        position = rng.randrange(len(deck))
+        card = deck.cards[position]
+        mask = rng.randrange(1, 1 << len(card.options))
+        samples.append((card, mask, position))
+    string_samples = [(card, card.mask_options(mask), position) for card, mask, position in samples]
+    assert all(grade_strings(*s)[1] == grade_mask(*m)[1] for s, m in zip(string_samples, samples))
+
+    string_time = time_per_call(grade_strings, string_samples)
+    mask_time = time_per_call(grade_mask, samples)
+    print(f"{len(deck)} cards")
+    print(f"  build_cards incl. masks: {build_time:8.3f} s (once per process)")
+    print(f"  md5 keys + set equality: {string_time * 1e6:8.2f} us/answer")
+    print(f"  id keys + bitmask:       {mask_time * 1e6:8.2f} us/answer ({string_time / mask_time:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
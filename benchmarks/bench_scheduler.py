@@ -0,0 +1,75 @@
+# benchmarks/bench_scheduler.py
+# Cost of picking and rescheduling cards with the heap-based Scheduler vs a linear scan for the
+# most overdue card, and throughput of the batched ReviewStore writer.
+# Usage: python benchmarks/bench_scheduler.py [--cards 100000] [--reviews 2000]
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scheduler import DAY, ReviewState, ReviewStore, Scheduler
+
+
+def scan_next_card(states, now):
+    """Baseline: walk every reviewed card to find the most overdue one."""
+    best = None
+    for position, state in states.items():
+        if state.due <= now and (best is None or state.due < states[best].due):
+            best = position
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark spaced-repetition scheduling.')
+    parser.add_argument('--cards', type=int, default=100_000)
+    parser.add_argument('--reviews', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    now = time.time()
+    keys = np.arange(args.cards, dtype=np.int64) * 7919
+    # Every card reviewed before, due anywhere from a week ago to a week from now
+    states = {int(k): ReviewState(due=now + rng.uniform(-7, 7) * DAY, interval=1.0, repetitions=1) for k in keys}
+
+    start = time.perf_counter()
+    scheduler = Scheduler(keys, states)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.reviews):
+        position = scheduler.next_card(now)
+        scheduler.review(position, rng.random() < 0.8, now)
+    heap_time = time.perf_counter() - start
+
+    by_position = {i: states[int(k)] for i, k in enumerate(keys)}
+    scan_reviews = max(1, args.reviews // 100)
+    start = time.perf_counter()
+    for _ in range(scan_reviews):
+        position = scan_next_card(by_position, now)
+        by_position[position] = ReviewState(due=now + DAY)
+    scan_time = (time.perf_counter() - start) / scan_reviews * args.reviews
+
+    print(f"{args.cards} cards, {args.reviews} reviews")
+    print(f"  build scheduler:          {build * 1e3:9.1f} ms")
+    print(f"  heap pick + reschedule:   {heap_time / args.reviews * 1e6:9.1f} us/review")
+    print(f"  linear scan pick:         {scan_time / args.reviews * 1e6:9.1f} us/review")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ReviewStore(os.path.join(tmp, 'reviews.sqlite3'))
+        start = time.perf_counter()
+        for i in range(args.reviews):
+            store.record('bench', int(keys[i % args.cards]), ReviewState(), True, now)
+        enqueue = time.perf_counter() - start
+        store.flush()
+        total = time.perf_counter() - start
+        print(f"  store.record (enqueue):   {enqueue / args.reviews * 1e6:9.1f} us/review")
+        print(f"  committed to SQLite:      {args.reviews / total:9.0f} reviews/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# benchmarks/bench_search.py
+# Card search per keystroke: pandas str.contains over the Question and Options text vs the
+# prefix-capable inverted index (search_index.py) built once next to the deck.
+# Usage: python benchmarks/bench_search.py [--rows 100000] [--repeats 20]
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from generators import make_synthetic_deck
+from deck import OPTIONS_COL, QUESTION_COL, Deck, prepare_flashcards, validate_flashcards
+from search_index import tokenize
+
+QUERIES = ['synthetic', 'question 123', 'option 4', 'opt 99-3', 'q']
+
+
+def contains_search(frame, text, query):
+    """The scan the index replaces: every word must start a word of the question or options."""
+    mask = None
+    for term in tokenize(query):
+        hits = text.str.contains(r'\b' + re.escape(term), regex=True)
+        mask = hits if mask is None else mask & hits
+    return frame.index[mask].to_numpy()
+
+
+def best_of(fn, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark str.contains scans vs the search index.')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    frame, _ = validate_flashcards(prepare_flashcards(make_synthetic_deck(args.rows)))
+    deck = Deck(frame)
+    text = (frame[QUESTION_COL] + ' ' + frame[OPTIONS_COL].str.join(' ')).str.lower()
+    start = time.perf_counter()
+    index = deck.search_index()
+    build_time = time.perf_counter() - start
+
+    print(f"{len(deck)} cards, index built in {build_time:.3f} s ({len(index.vocabulary)} tokens)")
+    print(f"{'query':>14} {'matches':>8} {'str.contains (ms)':>18} {'index (ms)':>11} {'speedup':>8}")
+    for query in QUERIES:
+        expected = contains_search(frame, text, query)
+        assert index.search(query).tolist() == expected.tolist(), query
+        scan_time = best_of(lambda: contains_search(frame, text, query), max(1, args.repeats // 10))
+        index_time = best_of(lambda: index.search(query), args.repeats)
+        print(f"{query!r:>14} {len(expected):>8} {scan_time * 1e3:>18.1f} {index_time * 1e3:>11.3f} {scan_time / index_time:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
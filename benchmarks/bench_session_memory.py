@@ -0,0 +1,43 @@
+# benchmarks/bench_session_memory.py
+# Per-session memory of the filtered deck: a copied DataFrame (old reset_quiz_state) vs a DeckView.
+# Usage: python benchmarks/bench_session_memory.py [--sizes 1000 100000] [--fraction 0.5]
+import argparse
+import os
+import pickle
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from generators import make_synthetic_deck
+from deck import CHAPTER_COL, Deck, DeckView, prepare_flashcards, select_card_ids, validate_flashcards
+
+
+def deep_frame_bytes(df):
+    """DataFrame memory as reported by pandas (string buffers and option list objects included)."""
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure per-session filtered deck memory.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000])
+    parser.add_argument('--fraction', type=float, default=0.5, help="Fraction of chapters selected")
+    args = parser.parse_args()
+
+    print(f"{'deck rows':>10} {'selected':>9} {'DataFrame copy':>15} {'DeckView':>10} {'pickled view':>13} {'saved':>7}")
+    for num_rows in args.sizes:
+        deck, _ = validate_flashcards(prepare_flashcards(make_synthetic_deck(num_rows)))
+        chapters = sorted(deck[CHAPTER_COL].unique())
+        selected = chapters[:max(1, int(len(chapters) * args.fraction))]
+
+        copied = deck[deck[CHAPTER_COL].isin(selected)].reset_index(drop=True)
+        shared = Deck(deck)
+        view = DeckView(shared.cards, select_card_ids(shared, selected))
+        copy_bytes = deep_frame_bytes(copied)
+        # The shared deck is not owned by the session; only the id array and the view object are
+        view_bytes = view.card_ids.nbytes + sys.getsizeof(view)
+        pickled_bytes = len(pickle.dumps(view.card_ids))
+        print(f"{num_rows:>10} {len(view):>9} {copy_bytes / 1e6:>13.2f}MB {view_bytes / 1e6:>8.3f}MB"
+              f" {pickled_bytes / 1e6:>11.3f}MB {copy_bytes / view_bytes:>6.0f}x")
+
+
+if __name__ == "__main__":
+    main()
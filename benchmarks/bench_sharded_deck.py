@@ -0,0 +1,70 @@
+# benchmarks/bench_sharded_deck.py
+# Startup time and resident memory of the whole compiled deck vs chapter shards: the sharded
+# deck reads only its manifest at startup and loads chapters when a session selects them.
+# Usage: python benchmarks/bench_sharded_deck.py [--rows 500000] [--chapters 200] [--selected 3]
+import argparse
+import contextlib
+import gc
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from generators import make_synthetic_deck
+from compiled_deck import compile_deck, load_compiled_deck
+from quiz import QuizEngine
+from sharded_deck import build_shards, load_sharded_deck
+
+
+def traced(fn):
+    """Runs fn and returns (result, seconds, bytes still allocated by it). Times include tracing overhead."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark whole-deck vs chapter-sharded loading.')
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--chapters', type=int, default=200)
+    parser.add_argument('--selected', type=int, default=3, help="Chapters a session studies")
+    parser.add_argument('--budget-mb', type=float, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'deck.csv')
+        make_synthetic_deck(args.rows, num_chapters=args.chapters).to_csv(csv_path, index=False)
+        with contextlib.redirect_stdout(io.StringIO()): # Validation warnings
+            compile_deck(csv_path)
+            start = time.perf_counter()
+            build_shards(csv_path)
+            build_time = time.perf_counter() - start
+
+        whole, whole_time, whole_bytes = traced(lambda: load_compiled_deck(csv_path).to_deck())
+        selected = whole.chapters[:args.selected]
+        del whole
+        budget = int(args.budget_mb * 1024 * 1024)
+        sharded, open_time, open_bytes = traced(lambda: load_sharded_deck(csv_path, budget))
+        session, select_time, select_bytes = traced(lambda: QuizEngine(sharded).new_session(selected))
+        _, reselect_time, _ = traced(lambda: QuizEngine(sharded).new_session(selected))
+
+        print(f"{args.rows} rows, {args.chapters} chapters; session studies {args.selected} chapters ({len(session)} cards)")
+        print(f"  build shards:           {build_time:8.3f} s (once per CSV change)")
+        print(f"  whole deck startup:     {whole_time:8.3f} s  {whole_bytes / 1e6:8.1f} MB")
+        print(f"  sharded startup:        {open_time:8.4f} s  {open_bytes / 1e6:8.3f} MB (manifest only)")
+        print(f"  first session (cold):   {select_time:8.3f} s  {select_bytes / 1e6:8.1f} MB")
+        print(f"  next session (cached):  {reselect_time:8.4f} s")
+        print(f"  shard cache: {sharded.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
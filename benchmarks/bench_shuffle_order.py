@@ -0,0 +1,55 @@
+# benchmarks/bench_shuffle_order.py
+# Per-session card order: a shuffled list of every filtered position (old QuizSession) vs a
+# SeededPermutation that computes positions on demand from (seed, n).
+# Usage: python benchmarks/bench_shuffle_order.py [--sizes 100000 1000000] [--lookups 100000]
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from permutation import SeededPermutation
+
+
+def shuffled_list(n, seed):
+    order = list(range(n))
+    random.Random(seed).shuffle(order)
+    return order
+
+
+def build(fn, n, seed):
+    """Returns (order, seconds to build, bytes it holds)."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    order = fn(n, seed)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return order, elapsed, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark shuffled list vs seeded permutation order.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--lookups', type=int, default=100_000, help="Cards studied (order[index] calls)")
+    args = parser.parse_args()
+
+    print(f"{'cards':>10} {'order':>12} {'build (ms)':>11} {'memory':>12} {'lookup (us)':>12}")
+    for n in args.sizes:
+        for name, fn in (('list', shuffled_list), ('permutation', SeededPermutation)):
+            order, build_time, held = build(fn, n, seed=42)
+            assert name == 'list' or sorted(order[:1000]) == sorted(set(order[:1000])) # Spot check: no repeats
+            lookups = min(args.lookups, n)
+            start = time.perf_counter()
+            for index in range(lookups):
+                order[index]
+            lookup_time = (time.perf_counter() - start) / lookups
+            print(f"{n:>10} {name:>12} {build_time * 1e3:>11.2f} {held / 1e6:>10.3f}MB {lookup_time * 1e6:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_startup.py
+# Cold start of the app in a fresh process: the old path imports pandas and loads the whole
+# deck before the sidebar's chapter list exists; fast start imports the app modules without
+# pandas, reads the chapter counts from the compiled deck header and loads the deck on a
+# background thread. Each mode runs in its own interpreter, so imports are really cold.
+# Usage: python benchmarks/bench_startup.py [--rows 200000] [--runs 3]
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from generators import make_synthetic_deck
+from compiled_deck import compile_deck
+
+# Runs in the child; prints the timings as JSON
+CHILD = '''
+import sys, time, json, threading
+start = time.perf_counter()
+csv_path, mode = sys.argv[1], sys.argv[2]
+import streamlit
+streamlit_done = time.perf_counter()
+import deck, compiled_deck, quiz, deck_watcher, event_log, scheduler, metrics, widget_state, sharded_deck
+if mode == 'eager':
+    import pandas # deck.py and compiled_deck.py imported it at module level before fast start
+imported = time.perf_counter()
+pandas_at_import = 'pandas' in sys.modules
+if mode == 'eager':
+    engine = quiz.QuizEngine(sharded_deck.load_deck(csv_path))
+    chapters = engine.chapters
+    sidebar = deck_ready = time.perf_counter()
+else:
+    result = {}
+    loader = threading.Thread(target=lambda: result.update(deck=sharded_deck.load_deck(csv_path)))
+    loader.start()
+    chapters = sorted(sharded_deck.load_chapter_counts(csv_path))
+    sidebar = time.perf_counter()
+    loader.join()
+    engine = quiz.QuizEngine(result['deck'])
+    deck_ready = time.perf_counter()
+print(json.dumps({'streamlit': streamlit_done - start, 'app_imports': imported - streamlit_done,
+                  'pandas_at_import': pandas_at_import, 'sidebar': sidebar - start, 'deck': deck_ready - start}))
+'''
+
+
+def run_child(csv_path, mode):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    output = subprocess.run([sys.executable, '-c', CHILD, csv_path, mode], env=env, cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark cold start: eager deck load vs fast start.')
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'deck.csv')
+        make_synthetic_deck(args.rows).to_csv(csv_path, index=False)
+        with contextlib.redirect_stdout(io.StringIO()): # Validation warnings
+            compile_deck(csv_path) # Both modes start from a fresh compiled deck
+
+        print(f"{args.rows} cards, median of {args.runs} cold runs (seconds since interpreter start)")
+        print(f"{'mode':>8} {'streamlit':>10} {'app imports':>12} {'pandas':>7} {'sidebar':>8} {'deck':>8}")
+        for mode in ('eager', 'fast'):
+            runs = [run_child(csv_path, mode) for _ in range(args.runs)]
+            med = {key: statistics.median(run[key] for run in runs) for key in ('streamlit', 'app_imports', 'sidebar', 'deck')}
+            pandas = 'yes' if runs[0]['pandas_at_import'] else 'no'
+            print(f"{mode:>8} {med['streamlit']:>10.3f} {med['app_imports']:>12.3f} {pandas:>7} {med['sidebar']:>8.3f} {med['deck']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
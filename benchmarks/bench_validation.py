@@ -0,0 +1,50 @@
+# benchmarks/bench_validation.py
+# Compares the vectorized deck validation in deck.py with the original per-row iterrows() loop.
+# Usage: python benchmarks/bench_validation.py [--sizes 1000 100000 1000000]
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from deck import OPTIONS_COL, ANSWER_COL, MULTI_ANSWER_SEP, prepare_flashcards, validate_flashcards
+from generators import make_synthetic_deck
+
+
+def validate_with_loop(df):
+    """The original load_flashcards validation loop, kept as the reference implementation."""
+    valid_rows = []
+    for index, row in df.iterrows():
+        options_set = set(row[OPTIONS_COL])
+        correct_answers_raw = row[ANSWER_COL]
+        is_multi = MULTI_ANSWER_SEP in correct_answers_raw
+        correct_answers_list = [ans.strip() for ans in correct_answers_raw.split(MULTI_ANSWER_SEP)] if is_multi else [correct_answers_raw.strip()]
+        if all(ans in options_set for ans in correct_answers_list if ans):
+            valid_rows.append(index)
+    return df.loc[valid_rows].reset_index(drop=True)
+
+
+def time_call(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark deck validation: iterrows loop vs vectorized.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'loop (s)':>10} {'vectorized (s)':>15} {'speedup':>8} {'rejected':>9}")
+    for num_rows in args.sizes:
+        df = prepare_flashcards(make_synthetic_deck(num_rows))
+        expected, loop_time = time_call(validate_with_loop, df)
+        (valid_df, rejected_df), vector_time = time_call(validate_flashcards, df)
+        pd.testing.assert_frame_equal(valid_df, expected)
+        print(f"{num_rows:>10} {loop_time:>10.3f} {vector_time:>15.3f} {loop_time / vector_time:>7.1f}x {len(rejected_df):>9}")
+
+
+if __name__ == "__main__":
+    main()
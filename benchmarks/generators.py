@@ -0,0 +1,114 @@
+# benchmarks/generators.py
+# Synthetic flashcard decks (CSV schema) and highlighted DOCX question banks for benchmarks.
+# Usage: python benchmarks/generators.py deck out.csv [--rows 100000] [--chapters 12] [--multi-ratio 0.2]
+#        python benchmarks/generators.py docx out.docx [--questions 5000] [--chapters 20] [--multi-ratio 0.2]
+import argparse
+import os
+import random
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from deck import MULTI_ANSWER_SEP, OPTION_SEP
+from event_log import EVENT_DTYPE, MAGIC as EVENT_MAGIC
+
+
+def make_synthetic_deck(num_rows, seed=0, invalid_ratio=0.01, num_chapters=12, multi_answer_ratio=0.2, num_options=4):
+    """Builds a raw (unparsed) deck frame in the CSV schema.
+
+    About multi_answer_ratio of the cards have two correct answers, and about invalid_ratio
+    have an answer that is not among their options (rejected by validation).
+    """
+    rng = random.Random(seed)
+    rows = []
+    for i in range(num_rows):
+        options = [f"Option {i}-{k}" for k in range(num_options)]
+        answers = rng.sample(options, 2) if rng.random() < multi_answer_ratio else [rng.choice(options)]
+        if rng.random() < invalid_ratio:
+            answers = [f"Missing {i}"]
+        rows.append({
+            'Chapter': f"Chapter {i % num_chapters + 1} - Synthetic",
+            'Question_No': i + 1,
+            'Question': f"Synthetic question {i}?",
+            'Options': OPTION_SEP.join(options),
+            'Correct Answer': MULTI_ANSWER_SEP.join(answers),
+        })
+    return pd.DataFrame(rows)
+
+
+def make_synthetic_docx(path, num_questions, num_chapters=20, seed=0, multi_answer_ratio=0.2):
+    """Writes a question bank in the converter's format: GREEN chapter headers, YELLOW answers."""
+    import docx
+    from docx.enum.text import WD_COLOR_INDEX
+
+    rng = random.Random(seed)
+    document = docx.Document()
+    per_chapter = max(1, num_questions // num_chapters)
+    for q in range(num_questions):
+        if q % per_chapter == 0:
+            chapter = document.add_paragraph().add_run(f"Chapter {q // per_chapter + 1} - Synthetic Topic")
+            chapter.font.highlight_color = WD_COLOR_INDEX.GREEN
+            document.add_paragraph("")
+        question = document.add_paragraph()
+        question.add_run(f"{q % per_chapter + 1}. ")
+        question.add_run(f"Synthetic question {q} about topic {rng.randint(1, 500)}?")
+        num_options = rng.randint(2, 5)
+        answers = set(rng.sample(range(num_options), 2 if rng.random() < multi_answer_ratio else 1))
+        for k in range(num_options):
+            option = document.add_paragraph().add_run(f"● Option {k} for question {q}")
+            if k in answers:
+                option.font.highlight_color = WD_COLOR_INDEX.YELLOW
+        document.add_paragraph("")
+    document.save(path)
+
+
+def make_synthetic_events(path, deck, num_events, num_learners=1000, seed=0, accuracy=0.7):
+    """Writes an answer event log for `deck`: random learners answering random cards.
+
+    Wrong answers pick one random option that is not an answer.
+    """
+    rng = np.random.default_rng(seed)
+    positions = rng.integers(0, len(deck), num_events)
+    answer_masks = np.fromiter((card.answer_mask for card in deck.cards), dtype=np.uint64, count=len(deck))[positions]
+    option_counts = np.fromiter((len(card.options) for card in deck.cards), dtype=np.int64, count=len(deck))[positions]
+    correct = rng.random(num_events) < accuracy
+    wrong_bits = np.uint64(1) << (rng.random(num_events) * option_counts).astype(np.uint64)
+    selected = np.where(correct, answer_masks, wrong_bits)
+    correct = selected == answer_masks # A "wrong" pick can be the answer itself
+    events = np.empty(num_events, dtype=EVENT_DTYPE)
+    events['time'] = 1.7e9 + np.sort(rng.random(num_events)) * 30 * 86400
+    events['card_key'] = deck.card_keys[positions]
+    events['learner'] = rng.integers(0, num_learners, num_events)
+    events['selected'] = selected
+    events['latency'] = rng.lognormal(2.0, 0.6, num_events)
+    events['correct'] = correct
+    with open(path, 'wb') as f:
+        f.write(EVENT_MAGIC)
+        f.write(events.tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic flashcard decks and DOCX question banks.')
+    parser.add_argument('kind', choices=['deck', 'docx'])
+    parser.add_argument('output')
+    parser.add_argument('--rows', '--questions', dest='size', type=int, default=None,
+                        help="Cards to generate (default: 100000 for a deck, 5000 for a docx)")
+    parser.add_argument('--chapters', type=int, default=None, help="Chapter count (default: 12 for a deck, 20 for a docx)")
+    parser.add_argument('--multi-ratio', type=float, default=0.2, help="Fraction of multi-answer cards")
+    parser.add_argument('--invalid-ratio', type=float, default=0.01, help="Fraction of invalid deck rows")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.kind == 'deck':
+        df = make_synthetic_deck(args.size or 100_000, args.seed, args.invalid_ratio, args.chapters or 12, args.multi_ratio)
+        df.to_csv(args.output, index=False)
+        print(f"Wrote {len(df)} cards to {args.output}")
+    else:
+        make_synthetic_docx(args.output, args.size or 5000, args.chapters or 20, args.seed, args.multi_ratio)
+        print(f"Wrote {args.size or 5000} questions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# benchmarks/load_test.py
+# Load test of the quiz engine: N concurrent simulated learners, each starting a session over
+# some chapters and answering cards. Sessions run on threads, as Streamlit runs each browser
+# session's script on its own thread, so the results are per server process.
+# Usage: python benchmarks/load_test.py [--sessions 200] [--answers 50] [--concurrency 32]
+#        [--rows 100000 | --csv deck.csv] [--spaced-repetition] [--no-review-store] [--no-event-log]
+#        [--json out.json]
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from generators import make_synthetic_deck
+from compiled_deck import load_compiled_deck
+from metrics import percentile
+from quiz import QuizEngine
+from scheduler import ReviewStore
+from event_log import AnswerEventLog
+
+
+class LatencyLog:
+    """Thread-safe latency samples per operation."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.samples.setdefault(name, []).append(seconds)
+
+    def summary(self):
+        report = {}
+        for name, samples in self.samples.items():
+            samples = sorted(samples)
+            report[name] = {'count': len(samples), 'p50_ms': percentile(samples, 0.5) * 1e3,
+                            'p95_ms': percentile(samples, 0.95) * 1e3, 'p99_ms': percentile(samples, 0.99) * 1e3,
+                            'max_ms': samples[-1] * 1e3}
+        return report
+
+
+def simulate_learner(engine, learner_id, args, log):
+    """One simulated learner: start a session, then answer up to args.answers cards."""
+    rng = random.Random(learner_id)
+    chapters = engine.chapters
+    selected = rng.sample(chapters, max(1, int(len(chapters) * args.chapter_fraction)))
+
+    start = time.perf_counter()
+    session = engine.new_session(selected, learner=f"learner-{learner_id}",
+                                 spaced_repetition=args.spaced_repetition, seed=learner_id)
+    log.add('new_session', time.perf_counter() - start)
+
+    answered = 0
+    for _ in range(args.answers):
+        if args.think_time:
+            time.sleep(rng.expovariate(1 / args.think_time))
+        start = time.perf_counter()
+        card = session.current_card()
+        if card is None:
+            break
+        # Answers are option bitmasks, as the app submits them
+        if rng.random() < args.accuracy:
+            selection = card.answer_mask
+        else:
+            wrong = [i for i in range(len(card.options)) if not card.answer_mask >> i & 1] or [0]
+            selection = 1 << rng.choice(wrong)
+        session.submit(selection)
+        session.next()
+        log.add('answer', time.perf_counter() - start)
+        answered += 1
+    return answered
+
+
+def build_deck(args, tmp):
+    csv_path = args.csv
+    if csv_path is None:
+        csv_path = os.path.join(tmp, 'deck.csv')
+        make_synthetic_deck(args.rows, num_chapters=args.chapters).to_csv(csv_path, index=False)
+    with contextlib.redirect_stdout(io.StringIO()): # Validation warnings
+        return load_compiled_deck(csv_path, os.path.join(tmp, 'deck.deck')).to_deck()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the quiz engine with concurrent simulated sessions.')
+    parser.add_argument('--sessions', type=int, default=200, help="Simulated learners")
+    parser.add_argument('--answers', type=int, default=50, help="Cards answered per learner")
+    parser.add_argument('--concurrency', type=int, default=32, help="Learners active at the same time (threads)")
+    parser.add_argument('--rows', type=int, default=100_000, help="Synthetic deck size (ignored with --csv)")
+    parser.add_argument('--chapters', type=int, default=12, help="Synthetic deck chapters")
+    parser.add_argument('--csv', help="Use this flashcard CSV instead of a synthetic deck")
+    parser.add_argument('--chapter-fraction', type=float, default=0.5, help="Fraction of chapters each learner selects")
+    parser.add_argument('--accuracy', type=float, default=0.7, help="Probability that a learner answers correctly")
+    parser.add_argument('--think-time', type=float, default=0.0, help="Mean seconds a learner waits before each answer")
+    parser.add_argument('--spaced-repetition', action='store_true', help="Serve cards from the scheduler")
+    parser.add_argument('--no-review-store', action='store_true', help="Don't persist reviews to SQLite")
+    parser.add_argument('--no-event-log', action='store_true', help="Don't append answer events to a log")
+    parser.add_argument('--json', help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        deck = build_deck(args, tmp)
+        store = None if args.no_review_store else ReviewStore(os.path.join(tmp, 'reviews.sqlite3'))
+        event_log = None if args.no_event_log else AnswerEventLog(os.path.join(tmp, 'answers.events'))
+        engine = QuizEngine(deck, store, event_log)
+        log = LatencyLog()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            answered = sum(pool.map(lambda i: simulate_learner(engine, i, args, log), range(args.sessions)))
+        elapsed = time.perf_counter() - start
+        flush_start = time.perf_counter()
+        if store is not None:
+            store.flush()
+        if event_log is not None:
+            event_log.flush()
+        flush_time = time.perf_counter() - flush_start
+
+    report = {
+        'params': {key: value for key, value in vars(args).items() if key != 'json'},
+        'deck_cards': len(deck),
+        'sessions': args.sessions,
+        'answers': answered,
+        'wall_s': elapsed,
+        'answers_per_s': answered / elapsed,
+        'sessions_per_s': args.sessions / elapsed,
+        'review_flush_s': flush_time,
+        'latency': log.summary(),
+    }
+    print(f"{len(deck)} cards, {args.sessions} sessions x {args.answers} answers, {args.concurrency} concurrent")
+    print(f"  wall time:   {elapsed:.2f}s ({answered} answers)")
+    print(f"  throughput:  {report['answers_per_s']:.0f} answers/s, {report['sessions_per_s']:.1f} sessions/s")
+    for name, stats in report['latency'].items():
+        print(f"  {name:<12} p50 {stats['p50_ms']:7.2f} ms  p95 {stats['p95_ms']:7.2f} ms"
+              f"  p99 {stats['p99_ms']:7.2f} ms  max {stats['max_ms']:7.2f} ms")
+    if store is not None or event_log is not None:
+        print(f"  queued reviews/events written {flush_time * 1e3:.0f} ms after the last answer")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
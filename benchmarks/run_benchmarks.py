@@ -0,0 +1,151 @@
+# benchmarks/run_benchmarks.py
+# Headless benchmark suite for the app's hot paths (deck loading, quiz reset, DOCX parsing).
+# Results are written as JSON so a later run can be compared against them as a baseline.
+# Usage: python benchmarks/run_benchmarks.py [--rows 100000] [--questions 2000] [--save baseline.json]
+#        python benchmarks/run_benchmarks.py --compare baseline.json [--threshold 0.2]
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from generators import make_synthetic_deck, make_synthetic_docx
+from compiled_deck import compile_deck, default_deck_path, load_compiled_deck
+from process_docx_highlight import parse_docx
+from quiz import QuizEngine
+
+SCHEMA_VERSION = 1
+
+
+def measure(fn, repeats, setup=None):
+    """Runs fn `repeats` times (after `setup`, untimed) and returns its timing stats in seconds."""
+    samples = []
+    for _ in range(repeats):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()): # The converter reports progress on stdout
+            fn()
+        samples.append(time.perf_counter() - start)
+    return {'median': statistics.median(samples), 'min': min(samples), 'max': max(samples), 'repeats': repeats}
+
+
+def load_flashcards(csv_path):
+    """What app.load_flashcards does on a cache miss, without Streamlit."""
+    return load_compiled_deck(csv_path).to_deck()
+
+
+def reset_quiz_state(engine, selected_chapters):
+    """The QuizSession that app.reset_quiz_state creates for a new chapter selection."""
+    return engine.new_session(selected_chapters)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'deck.csv')
+        make_synthetic_deck(args.rows, num_chapters=args.chapters, multi_answer_ratio=args.multi_ratio).to_csv(csv_path, index=False)
+        deck_path = default_deck_path(csv_path)
+        remove_deck = lambda: os.path.exists(deck_path) and os.remove(deck_path)
+
+        # First start after the CSV changed: parse, validate and compile, then map
+        results['load_flashcards_cold'] = measure(lambda: load_flashcards(csv_path), args.repeats, setup=remove_deck)
+        # Every later start: map the compiled deck
+        with contextlib.redirect_stdout(io.StringIO()):
+            compile_deck(csv_path)
+        results['load_flashcards_warm'] = measure(lambda: load_flashcards(csv_path), args.repeats)
+
+        engine = QuizEngine(load_flashcards(csv_path))
+        half = engine.chapters[:max(1, len(engine.chapters) // 2)]
+        results['reset_quiz_state_all'] = measure(lambda: reset_quiz_state(engine, engine.chapters), args.repeats)
+        results['reset_quiz_state_half'] = measure(lambda: reset_quiz_state(engine, half), args.repeats)
+
+        docx_path = os.path.join(tmp, 'bank.docx')
+        make_synthetic_docx(docx_path, args.questions, num_chapters=args.chapters, multi_answer_ratio=args.multi_ratio)
+        results['parse_docx'] = measure(lambda: parse_docx(docx_path), args.repeats)
+        results['parse_docx_stream'] = measure(lambda: parse_docx(docx_path, streaming=True), args.repeats)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Prints current vs baseline medians; returns the names that got slower than threshold allows."""
+    regressions = []
+    print(f"{'benchmark':<24} {'baseline (ms)':>14} {'current (ms)':>13} {'ratio':>7}")
+    for name, stats in results.items():
+        before = baseline['results'].get(name)
+        if before is None:
+            print(f"{name:<24} {'-':>14} {stats['median'] * 1e3:>13.2f} {'new':>7}")
+            continue
+        ratio = stats['median'] / before['median']
+        flag = ''
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<24} {before['median'] * 1e3:>14.2f} {stats['median'] * 1e3:>13.2f} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the headless benchmark suite.')
+    parser.add_argument('--rows', type=int, default=100_000, help="Cards in the synthetic deck")
+    parser.add_argument('--chapters', type=int, default=12)
+    parser.add_argument('--multi-ratio', type=float, default=0.2, help="Fraction of multi-answer cards")
+    parser.add_argument('--questions', type=int, default=2000, help="Questions in the synthetic DOCX bank")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--save', help="Write the results to this JSON file")
+    parser.add_argument('--compare', help="Compare against a saved JSON baseline")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    params = {'rows': args.rows, 'chapters': args.chapters, 'multi_ratio': args.multi_ratio,
+              'questions': args.questions, 'repeats': args.repeats}
+    results = run_suite(args)
+    report = {
+        'schema': SCHEMA_VERSION,
+        'meta': {'created': datetime.datetime.now().isoformat(timespec='seconds'), 'commit': git_commit(),
+                 'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'params': params,
+        'results': results,
+    }
+
+    status = 0
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('params') != params:
+            print(f"Warning: Baseline was run with different parameters: {baseline.get('params')}")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            status = 1
+    else:
+        print(f"{'benchmark':<24} {'median (ms)':>12} {'min (ms)':>10}")
+        for name, stats in results.items():
+            print(f"{name:<24} {stats['median'] * 1e3:>12.2f} {stats['min'] * 1e3:>10.2f}")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.save}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
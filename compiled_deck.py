@@ -0,0 +1,301 @@
+# compiled_deck.py
+# Compiles a validated flashcard CSV into a compact columnar binary file (.deck) that is
+# memory-mapped at startup, so worker processes share its pages and never re-parse the CSV.
+#
+# File layout (all integers little-endian):
+#   MAGIC (8 bytes) | header length (uint32) | JSON header, padded to 8 bytes | arrays | string blob
+# The JSON header records the source CSV fingerprint, the interned chapter names and the
+# offset/dtype/length of every array. The blob holds every string as UTF-8, NUL-separated;
+# a card's answer string is followed by its options, so option_start is all to_frame needs.
+# The header also carries the card count per chapter, so read_chapter_counts can give the app
+# its chapter list without mapping the arrays or importing pandas.
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from deck import (
+    QUESTION_COL, OPTIONS_COL, ANSWER_COL, CHAPTER_COL, MULTI_ANSWER_SEP,
+    ChapterIndex, Deck, DeckFormatError, compute_card_keys, options_mask, read_flashcards, report_rejected,
+)
+
+# --- Configuration ---
+MAGIC = b'SCFDECK\x01'
+FORMAT_VERSION = 5 # 2: adds card_key, 3: adds answer_mask, 4: repeated options kept once, 5: drops unread arrays
+DECK_SUFFIX = '.deck'
+QUESTION_NO_COL = 'Question_No'
+_HEADER_LEN = struct.Struct('<I')
+_ALIGN = 8
+
+
+# --- Source fingerprint ---
+def file_sha256(file_path):
+    """Returns the hex SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_fingerprint(file_path):
+    """Size, mtime and content hash of the source CSV, stored in the compiled header."""
+    stat = os.stat(file_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_sha256(file_path)}
+
+
+# --- Build ---
+def _pad(length):
+    return (-length) % _ALIGN
+
+
+def compile_flashcards(df, source=None):
+    """Serializes a validated flashcard frame (as returned by read_flashcards) to .deck bytes."""
+    strings = [] # String table; ids index into it
+    def intern(text):
+        if '\0' in text:
+            raise DeckFormatError("Flashcard text must not contain NUL characters.")
+        strings.append(text)
+        return len(strings) - 1
+
+    chapters = sorted(df[CHAPTER_COL].astype(str).unique().tolist())
+    chapter_lookup = {name: i for i, name in enumerate(chapters)}
+
+    num_cards = len(df)
+    question_sid = np.empty(num_cards, dtype='<u4')
+    answer_sid = np.empty(num_cards, dtype='<u4')
+    option_start = np.zeros(num_cards + 1, dtype='<u4')
+    answer_mask = np.zeros(num_cards, dtype='<u8')
+    num_options = 0
+    for i, (question, options, answer_raw) in enumerate(zip(df[QUESTION_COL], df[OPTIONS_COL], df[ANSWER_COL])):
+        question_sid[i] = intern(str(question))
+        answer_sid[i] = intern(answer_raw)
+        # Options directly follow the answer string in the table (to_frame relies on this)
+        for opt in options:
+            intern(opt)
+        num_options += len(options)
+        option_start[i + 1] = num_options
+        # The Card answer bitmask, so loading doesn't compute it per card (cards over 64 options fall back)
+        if len(options) > 64:
+            answer_mask = None
+        elif answer_mask is not None:
+            answer_mask[i] = options_mask(options, frozenset(ans.strip() for ans in answer_raw.split(MULTI_ANSWER_SEP)))
+
+    if QUESTION_NO_COL in df.columns:
+        import pandas as pd
+
+        question_no = pd.to_numeric(df[QUESTION_NO_COL], errors='coerce').fillna(0).to_numpy(dtype='<i8')
+    else:
+        question_no = np.zeros(num_cards, dtype='<i8')
+
+    chapter_id = df[CHAPTER_COL].astype(str).map(chapter_lookup).to_numpy(dtype='<u4')
+    blob = b'\0'.join(text.encode('utf-8') for text in strings) + b'\0'
+
+    arrays = {
+        'chapter_id': chapter_id,
+        'card_key': compute_card_keys(df).astype('<i8'),
+        'question_no': question_no,
+        'question_sid': question_sid,
+        'answer_sid': answer_sid,
+        'option_start': option_start,
+    }
+    if answer_mask is not None:
+        arrays['answer_mask'] = answer_mask
+
+    # Lay out arrays after the header; offsets are relative to the start of the data section
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        layout[name] = {'dtype': array.dtype.str, 'offset': offset, 'length': len(array)}
+        offset += array.nbytes + _pad(array.nbytes)
+    header = {
+        'version': FORMAT_VERSION,
+        'source': source,
+        'num_cards': num_cards,
+        'num_strings': len(strings),
+        'chapters': chapters,
+        'chapter_counts': np.bincount(chapter_id, minlength=len(chapters)).tolist(), # Parallel to chapters
+        'arrays': layout,
+        'blob': {'offset': offset, 'length': len(blob)},
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    header_bytes += b' ' * _pad(len(MAGIC) + _HEADER_LEN.size + len(header_bytes))
+
+    parts = [MAGIC, _HEADER_LEN.pack(len(header_bytes)), header_bytes]
+    for array in arrays.values():
+        parts.append(array.tobytes())
+        parts.append(b'\0' * _pad(array.nbytes))
+    parts.append(blob)
+    return b''.join(parts)
+
+
+def compile_deck(csv_path, deck_path=None):
+    """Reads and validates csv_path and writes the compiled deck atomically. Returns the deck path."""
+    deck_path = deck_path or default_deck_path(csv_path)
+    source = source_fingerprint(csv_path)
+    df, rejected_df = read_flashcards(csv_path)
+    report_rejected(rejected_df)
+    data = compile_flashcards(df, source)
+
+    # Write to a temp file and rename, so concurrent workers never map a half-written deck
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(deck_path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, 0o644) # mkstemp creates 0600; workers may run as another user
+        os.replace(tmp_path, deck_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return deck_path
+
+
+# --- Load ---
+class CompiledDeck:
+    """Read-only view over compiled deck bytes (usually a shared mmap). Arrays are zero-copy."""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        if bytes(buffer[:len(MAGIC)]) != MAGIC:
+            raise DeckFormatError("Not a compiled flashcard deck.")
+        (header_len,) = _HEADER_LEN.unpack_from(buffer, len(MAGIC))
+        header_start = len(MAGIC) + _HEADER_LEN.size
+        self.header = json.loads(bytes(buffer[header_start:header_start + header_len]))
+        if self.header.get('version') != FORMAT_VERSION:
+            raise DeckFormatError(f"Unsupported deck format version {self.header.get('version')}.")
+        data_start = header_start + header_len
+
+        self.chapters = self.header['chapters']
+        self.arrays = {}
+        for name, spec in self.header['arrays'].items():
+            self.arrays[name] = np.frombuffer(buffer, dtype=spec['dtype'], count=spec['length'],
+                                              offset=data_start + spec['offset'])
+        blob = self.header['blob']
+        self._blob = memoryview(buffer)[data_start + blob['offset']:data_start + blob['offset'] + blob['length']]
+
+    def __len__(self):
+        return self.header['num_cards']
+
+    @property
+    def source(self):
+        return self.header['source']
+
+    @property
+    def chapter_ids(self):
+        return self.arrays['chapter_id']
+
+    def to_frame(self):
+        """Builds the flashcard DataFrame that read_flashcards would return, without any parsing."""
+        import pandas as pd
+
+        # One bulk decode + split of the NUL-separated blob, then pure indexing
+        strings = str(self._blob, 'utf-8').split('\0')
+        a = self.arrays
+        # A card's option strings are interned back to back, so each card's options are one slice
+        option_counts = np.diff(a['option_start'].astype(np.int64))
+        first_option = a['answer_sid'].astype(np.int64) + 1
+        return pd.DataFrame({
+            CHAPTER_COL: pd.Categorical.from_codes(a['chapter_id'].astype(np.int32), self.chapters).astype(str),
+            QUESTION_NO_COL: a['question_no'].astype(np.int64),
+            QUESTION_COL: [strings[sid] for sid in a['question_sid'].tolist()],
+            OPTIONS_COL: [strings[first:first + count]
+                          for first, count in zip(first_option.tolist(), option_counts.tolist())],
+            ANSWER_COL: [strings[sid] for sid in a['answer_sid'].tolist()],
+        })
+
+
+    def to_deck(self):
+        """Builds the shared Deck; the chapter index, card keys and answer masks come straight from the arrays."""
+        return Deck(self.to_frame(), ChapterIndex(self.chapters, self.chapter_ids), self.arrays['card_key'],
+                    fingerprint=(self.source or {}).get('sha256'), answer_masks=self.arrays.get('answer_mask'))
+
+
+def default_deck_path(csv_path):
+    return os.path.splitext(csv_path)[0] + DECK_SUFFIX
+
+
+def open_deck(deck_path):
+    """Memory-maps a compiled deck file read-only."""
+    with open(deck_path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return CompiledDeck(mapped)
+
+
+def is_fresh(deck, csv_path):
+    """True if the compiled deck was built from the current csv_path (mtime/size, then hash)."""
+    return source_is_current(deck.source, csv_path)
+
+
+def source_is_current(source, csv_path):
+    """True if `source` (a source_fingerprint) still describes csv_path."""
+    source = source or {}
+    stat = os.stat(csv_path)
+    if source.get('size') == stat.st_size and source.get('mtime_ns') == stat.st_mtime_ns:
+        return True
+    # mtime changed (e.g. a fresh checkout): only rebuild if the content really changed
+    return source.get('size') == stat.st_size and source.get('sha256') == file_sha256(csv_path)
+
+
+def read_header(deck_path):
+    """The JSON header of a compiled deck file, read without mapping the file."""
+    with open(deck_path, 'rb') as f:
+        prefix = f.read(len(MAGIC) + _HEADER_LEN.size)
+        if prefix[:len(MAGIC)] != MAGIC or len(prefix) < len(MAGIC) + _HEADER_LEN.size:
+            raise DeckFormatError("Not a compiled flashcard deck.")
+        (header_len,) = _HEADER_LEN.unpack_from(prefix, len(MAGIC))
+        return json.loads(f.read(header_len))
+
+
+def read_chapter_counts(csv_path, deck_path=None):
+    """{chapter: card count} from a fresh compiled deck's header, or None if there is no usable one.
+
+    Cheap enough to render the chapter list before the deck itself has loaded.
+    """
+    deck_path = deck_path or default_deck_path(csv_path)
+    try:
+        header = read_header(deck_path)
+        if header.get('version') != FORMAT_VERSION or not source_is_current(header.get('source'), csv_path):
+            return None
+        counts = header.get('chapter_counts')
+        if counts is None: # Compiled before the header had counts: count the mapped chapter ids
+            counts = np.bincount(open_deck(deck_path).chapter_ids, minlength=len(header['chapters'])).tolist()
+    except (DeckFormatError, ValueError, OSError):
+        return None
+    return dict(zip(header['chapters'], counts))
+
+
+def load_compiled_deck(csv_path, deck_path=None):
+    """Returns a CompiledDeck for csv_path, rebuilding the .deck file if it is missing or stale.
+
+    If the deck cannot be written (e.g. a read-only checkout) it is compiled in memory instead.
+    """
+    deck_path = deck_path or default_deck_path(csv_path)
+    if os.path.exists(deck_path):
+        try:
+            deck = open_deck(deck_path)
+            if is_fresh(deck, csv_path):
+                return deck
+        except (DeckFormatError, ValueError, OSError) as e:
+            print(f"Warning: Rebuilding unreadable deck file '{deck_path}': {e}")
+    try:
+        return open_deck(compile_deck(csv_path, deck_path))
+    except PermissionError:
+        df, rejected_df = read_flashcards(csv_path)
+        report_rejected(rejected_df)
+        return CompiledDeck(compile_flashcards(df, source_fingerprint(csv_path)))
+
+
+# --- Execution ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile a flashcard CSV into a memory-mappable .deck file.")
+    parser.add_argument('csv_path', help="Source flashcard CSV")
+    parser.add_argument('-o', '--output', help="Output .deck path (default: next to the CSV)")
+    args = parser.parse_args()
+    output = compile_deck(args.csv_path, args.output)
+    print(f"Compiled {len(open_deck(output))} flashcards to {output}")
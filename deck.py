@@ -0,0 +1,298 @@
+# deck.py
+# Streamlit-free deck loading and validation, shared by app.py, tools and benchmarks.
+# pandas is imported inside the functions that parse a CSV, so importing this module (and
+# starting the app from a compiled deck's chapter manifest) doesn't pay for it.
+import hashlib
+
+import numpy as np
+
+from search_index import SearchIndex
+
+# --- Configuration ---
+QUESTION_COL = 'Question'
+OPTIONS_COL = 'Options'
+ANSWER_COL = 'Correct Answer'
+CHAPTER_COL = 'Chapter'
+REQUIRED_COLS = [CHAPTER_COL, QUESTION_COL, OPTIONS_COL, ANSWER_COL]
+OPTION_SEP = '|' # Separator between options
+MULTI_ANSWER_SEP = ';;' # Separator for multiple correct answers
+REASON_COL = 'Reason' # Column holding the rejection reason for invalid rows
+
+
+class DeckFormatError(ValueError):
+    """Raised when a deck file does not have the expected structure."""
+
+
+# --- Parsing ---
+def prepare_flashcards(df):
+    """Fills missing values and splits the Options column into lists of stripped options."""
+    df = df.reset_index(drop=True)
+    # Fill potential NaN values in critical columns to avoid errors
+    df[QUESTION_COL] = df[QUESTION_COL].fillna('')
+    df[OPTIONS_COL] = df[OPTIONS_COL].fillna('')
+    df[ANSWER_COL] = df[ANSWER_COL].fillna('').astype(str)
+    df[CHAPTER_COL] = df[CHAPTER_COL].fillna('Unknown')
+
+    # Non-string option cells (e.g. numbers) are treated as having no options. A repeated
+    # option text is kept once: both copies would be the same answer, but only one radio value
+    df[OPTIONS_COL] = [
+        list(dict.fromkeys(opt.strip() for opt in options_str.split(OPTION_SEP))) if isinstance(options_str, str) else []
+        for options_str in df[OPTIONS_COL]
+    ]
+    return df
+
+
+# --- Validation ---
+def validate_flashcards(df):
+    """Checks every correct answer against its row's options in one vectorized pass.
+
+    Expects a frame produced by prepare_flashcards. Returns (valid_df, rejected_df):
+    valid_df keeps the rows whose non-empty answers all appear among the options,
+    re-indexed from 0; rejected_df holds the other rows plus a Reason column.
+    """
+    import pandas as pd
+
+    # One (row, option) pair per option and one (row, answer) pair per non-empty answer
+    options = df[OPTIONS_COL].explode().dropna()
+    answers = df[ANSWER_COL].str.split(MULTI_ANSWER_SEP, regex=False).explode().str.strip()
+    answers = answers[answers != '']
+
+    # Set-membership join: factorize option and answer texts against one shared codebook,
+    # then an answer is valid if its (row, code) key is among the option keys
+    texts = pd.concat([options, answers])
+    codes, uniques = pd.factorize(texts.to_numpy())
+    keys = texts.index.to_numpy(dtype=np.int64) * max(len(uniques), 1) + codes
+    option_keys, answer_keys = keys[:len(options)], keys[len(options):]
+    missing = answers[~pd.Series(answer_keys).isin(option_keys).to_numpy()]
+
+    is_rejected = df.index.isin(missing.index)
+    valid_df = df[~is_rejected].reset_index(drop=True)
+
+    rejected_df = df[is_rejected].copy()
+    missing_by_row = missing.groupby(level=0).agg(lambda answers_missing: "', '".join(answers_missing))
+    rejected_df[REASON_COL] = "Correct answer(s) not in options: '" + missing_by_row.reindex(rejected_df.index) + "'"
+    return valid_df, rejected_df
+
+
+def read_flashcards(file_path):
+    """Reads, parses and validates a flashcard CSV. Returns (valid_df, rejected_df).
+
+    Raises DeckFormatError if a required column is missing; file errors propagate to the caller.
+    """
+    import pandas as pd
+
+    df = pd.read_csv(file_path)
+    if not all(col in df.columns for col in REQUIRED_COLS):
+        raise DeckFormatError(f"CSV file must contain columns: {', '.join(REQUIRED_COLS)}")
+    return validate_flashcards(prepare_flashcards(df))
+
+
+def report_rejected(rejected_df, limit=10):
+    """Prints a summary of rejected rows with the reason for each (first `limit` rows)."""
+    if rejected_df.empty:
+        return
+    print(f"Warning: Filtered out {len(rejected_df)} rows due to mismatch between answers and options.")
+    for index, row in rejected_df.head(limit).iterrows():
+        print(f"  Row {index} ({row[CHAPTER_COL]}): {row[REASON_COL]}")
+    if len(rejected_df) > limit:
+        print(f"  ... and {len(rejected_df) - limit} more.")
+
+
+# --- Shared deck and indexes ---
+CARD_ID_DTYPE = np.int32 # Row positions into the shared deck frame
+CARD_KEY_DTYPE = np.int64 # Stable content-derived card keys
+
+
+def card_key(chapter, question):
+    """Stable 64-bit key for a card, derived from its chapter and question text.
+
+    Unlike a deck position it survives reordering and regenerating the CSV, so review
+    history can be stored against it.
+    """
+    digest = hashlib.blake2b(f"{chapter}\x1f{question}".encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
+
+def compute_card_keys(df):
+    """card_key for every row of a flashcard frame, as an int64 array."""
+    keys = (card_key(chapter, question) for chapter, question in zip(df[CHAPTER_COL], df[QUESTION_COL]))
+    return np.fromiter(keys, dtype=CARD_KEY_DTYPE, count=len(df))
+
+
+class ChapterIndex:
+    """Inverted index from chapter name to the (sorted) deck positions of its cards."""
+
+    def __init__(self, chapters, chapter_codes):
+        """chapters: chapter names; chapter_codes: per card, the position of its chapter in `chapters`."""
+        chapter_codes = np.asarray(chapter_codes)
+        # A stable sort groups card positions by chapter while keeping deck order inside each group
+        order = np.argsort(chapter_codes, kind='stable').astype(CARD_ID_DTYPE)
+        counts = np.bincount(chapter_codes, minlength=len(chapters)) if len(chapter_codes) else np.zeros(len(chapters), dtype=np.int64)
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        self.chapters = sorted(chapters)
+        self.card_ids = {name: order[bounds[i]:bounds[i + 1]] for i, name in enumerate(chapters)}
+        self.counts = {name: int(count) for name, count in zip(chapters, counts)}
+
+    @classmethod
+    def from_frame(cls, df):
+        import pandas as pd
+
+        codes, chapters = pd.factorize(df[CHAPTER_COL])
+        return cls(list(chapters), codes)
+
+    @classmethod
+    def concat(cls, indexes):
+        """Index of decks laid end to end (as Deck.combine does); chapters must not repeat."""
+        index = cls.__new__(cls)
+        index.card_ids, index.counts = {}, {}
+        offset = 0
+        for part, size in indexes:
+            for name, ids in part.card_ids.items():
+                index.card_ids[name] = ids + CARD_ID_DTYPE(offset)
+                index.counts[name] = part.counts[name]
+            offset += size
+        index.chapters = sorted(index.card_ids)
+        return index
+
+    def select(self, selected_chapters):
+        """Union of the selected chapters' card positions (chapters are disjoint, so a concatenation)."""
+        selected = set(selected_chapters)
+        parts = [self.card_ids[name] for name in self.chapters if name in selected]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=CARD_ID_DTYPE)
+
+
+def options_mask(options, selected):
+    """Bitmask of the options whose text is in `selected` (bit i = options[i]).
+
+    Only the first position of a repeated option text is set, so a single answer is one bit.
+    """
+    mask = 0
+    seen = set()
+    for i, option in enumerate(options):
+        if option in selected and option not in seen:
+            mask |= 1 << i
+            seen.add(option)
+    return mask
+
+
+class Card:
+    """One flashcard, ready to render: options and answers are split once at load time.
+
+    Options are identified by their position in `options`; a set of options is an int
+    bitmask (bit i = options[i]), so grading compares two ints.
+    """
+    __slots__ = ('key', 'chapter', 'question', 'options', 'answer_text', 'answers', 'is_multi', 'answer_mask')
+
+    def __init__(self, key, chapter, question, options, answer_text, answer_mask=None):
+        self.key = key # Stable card_key
+        self.chapter = chapter
+        self.question = question
+        self.options = tuple(options) # Shared between sessions, so immutable
+        self.answer_text = answer_text # Raw Correct Answer cell
+        self.is_multi = MULTI_ANSWER_SEP in answer_text
+        if self.is_multi:
+            self.answers = frozenset(ans.strip() for ans in answer_text.split(MULTI_ANSWER_SEP))
+        else:
+            self.answers = frozenset((answer_text.strip(),))
+        self.answer_mask = options_mask(self.options, self.answers) if answer_mask is None else answer_mask
+
+    def options_mask(self, selected):
+        return options_mask(self.options, selected)
+
+    def mask_options(self, mask):
+        """The options in `mask`, in card order."""
+        return [option for i, option in enumerate(self.options) if mask >> i & 1]
+
+
+def build_cards(df, card_keys, answer_masks=None):
+    """Card records for every row of a flashcard frame, as a tuple indexed by deck position.
+
+    answer_masks: precomputed answer bitmasks (from a compiled deck); computed per card otherwise.
+    """
+    columns = [card_keys.tolist(), df[CHAPTER_COL].tolist(), df[QUESTION_COL].tolist(),
+               df[OPTIONS_COL].tolist(), df[ANSWER_COL].tolist()]
+    if answer_masks is not None:
+        columns.append(answer_masks.tolist())
+    return tuple(map(Card, *columns))
+
+
+class Deck:
+    """The shared, read-only deck: Card records plus the indexes built once at load time.
+
+    The card frame is only read while building them; the deck doesn't keep it.
+    """
+    __slots__ = ('chapter_index', 'card_keys', 'cards', 'fingerprint', 'parts', '_search_index', '__weakref__')
+
+    def __init__(self, frame, chapter_index=None, card_keys=None, fingerprint=None, answer_masks=None):
+        self.fingerprint = fingerprint # Content hash of the source file, when known
+        self.parts = () # The decks a combined deck shares its cards with (see combine)
+        self.chapter_index = chapter_index if chapter_index is not None else ChapterIndex.from_frame(frame)
+        self.card_keys = card_keys if card_keys is not None else compute_card_keys(frame)
+        # Renders read cards from here instead of building a pandas row every rerun
+        self.cards = build_cards(frame, self.card_keys, answer_masks)
+        self._search_index = None
+
+    @classmethod
+    def combine(cls, decks, fingerprint=None):
+        """One deck over the cards of several decks with disjoint chapters (e.g. chapter shards).
+
+        The Card records are shared, not copied, and the parts are kept alive with it.
+        """
+        deck = cls.__new__(cls)
+        deck.parts = tuple(decks)
+        deck.fingerprint = fingerprint
+        deck.chapter_index = ChapterIndex.concat([(part.chapter_index, len(part)) for part in decks])
+        deck.card_keys = np.concatenate([part.card_keys for part in decks]) if decks else np.empty(0, dtype=CARD_KEY_DTYPE)
+        deck.cards = tuple(card for part in decks for card in part.cards)
+        deck._search_index = None
+        return deck
+
+    def __len__(self):
+        return len(self.cards)
+
+    @property
+    def chapters(self):
+        return self.chapter_index.chapters
+
+    @property
+    def chapter_counts(self):
+        return self.chapter_index.counts
+
+    def search_index(self):
+        """The text search index over the cards, built on first use."""
+        if self._search_index is None:
+            self._search_index = SearchIndex(self.cards)
+        return self._search_index
+
+    def select(self, selected_chapters):
+        """Returns (deck, card_ids): the deck holding the selected chapters and their positions in it."""
+        return self, select_card_ids(self, selected_chapters)
+
+
+def select_card_ids(deck, selected_chapters):
+    """Returns the deck positions of the cards in the selected chapters as a compact int32 array."""
+    return deck.chapter_index.select(selected_chapters)
+
+
+# --- Session views ---
+class DeckView:
+    """A per-session subset of the shared deck: the deck's cards plus an array of card positions.
+
+    Only the position array belongs to the session; the cards are the one cached deck's.
+    """
+    __slots__ = ('cards', 'card_ids')
+
+    def __init__(self, cards, card_ids):
+        self.cards = cards
+        self.card_ids = card_ids
+
+    def __len__(self):
+        return len(self.card_ids)
+
+    @property
+    def empty(self):
+        return self.cards is None or len(self.card_ids) == 0
+
+    def card(self, position):
+        """Returns the Card at `position` within this view."""
+        return self.cards[self.card_ids[position]]
@@ -0,0 +1,83 @@
+# deck_watcher.py
+# Hot reload of the flashcard CSV: a background thread polls the file's mtime and size and,
+# when it changes, rebuilds the deck off the request path and swaps it into the QuizEngine.
+# Live sessions move onto the new deck by card key (QuizSession._remap), so nothing restarts.
+import os
+import threading
+
+from metrics import TIMINGS
+from sharded_deck import load_deck
+
+# --- Configuration ---
+POLL_INTERVAL = 2.0 # Seconds between checks of the CSV
+
+
+class DeckWatcher:
+    """Reloads `csv_path` into `engine` whenever the file changes."""
+
+    def __init__(self, csv_path, engine, interval=POLL_INTERVAL, deck_path=None, shard_budget_mb=None):
+        self.csv_path = csv_path
+        self.deck_path = deck_path
+        self.shard_budget_mb = shard_budget_mb # Reload as chapter shards (see sharded_deck.load_deck)
+        self.engine = engine
+        self.interval = interval
+        self._stat = self._read_stat() # (mtime_ns, size) of the loaded file
+        self._pending = None # A changed stat seen on the previous poll
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _read_stat(self):
+        try:
+            stat = os.stat(self.csv_path)
+        except OSError: # Mid-replace or deleted: keep serving the current deck
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='deck-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self):
+        """One poll. Reloads once a change has held for a whole poll, so a file that is still
+        being copied in is not loaded half-written. Returns True if the deck was swapped."""
+        stat = self._read_stat()
+        if stat is None or stat == self._stat:
+            self._pending = None
+            return False
+        if stat != self._pending:
+            self._pending = stat
+            return False
+        self._pending = None
+        self._stat = stat
+        return self.reload()
+
+    def reload(self):
+        """Rebuilds the deck from the CSV and swaps it in; on failure the current deck stays."""
+        try:
+            with TIMINGS.timer('reload_deck'):
+                deck = load_deck(self.csv_path, self.shard_budget_mb, self.deck_path)
+        except Exception as e:
+            print(f"Warning: Keeping the current deck, reloading '{self.csv_path}' failed: {e}")
+            return False
+        if deck.fingerprint is not None and deck.fingerprint == self.engine.deck.fingerprint:
+            return False # Touched or rewritten with the same content: sessions keep the deck they have
+        if len(deck) == 0:
+            print(f"Warning: Keeping the current deck, '{self.csv_path}' has no valid flashcards.")
+            return False
+        with TIMINGS.timer('build_search_index'):
+            deck.search_index() # Here rather than lazily in a request after the swap, like at startup
+        version = self.engine.swap_deck(deck)
+        print(f"Reloaded {len(deck)} flashcards from '{self.csv_path}' (deck version {version}).")
+        return True
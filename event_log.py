@@ -0,0 +1,122 @@
+# event_log.py
+# Append-only log of every submitted answer, read back by analytics.py. Events are fixed-size
+# binary records (EVENT_DTYPE) so millions of them load with one np.fromfile. record() only
+# enqueues; a background thread appends them in batches, so answering never waits on the disk.
+#
+# File layout: MAGIC (8 bytes) followed by packed EVENT_DTYPE records. Each batch is a single
+# O_APPEND write, so several worker processes can share one log.
+import hashlib
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+# --- Configuration ---
+EVENT_LOG = 'answers.events'
+MAGIC = b'SCFEVT\x00\x01'
+EVENT_DTYPE = np.dtype([
+    ('time', '<f8'), # Unix time of the submission
+    ('card_key', '<i8'), # Stable card key (deck.card_key)
+    ('learner', '<i8'), # learner_key() of the learner name
+    ('selected', '<u8'), # Option bitmask of the submitted answer (bit i = options[i])
+    ('latency', '<f4'), # Seconds from showing the card to submitting
+    ('correct', 'u1'),
+])
+
+
+def learner_key(learner):
+    """Stable 64-bit id for a learner name (names themselves are not logged)."""
+    digest = hashlib.blake2b(learner.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
+
+class AnswerEventLog:
+    """Buffered writer for the answer event log."""
+
+    def __init__(self, path=EVENT_LOG, batch_size=1024, flush_interval=1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._learners = {} # learner name -> learner_key, hashed once per learner
+        self._queue = queue.Queue()
+        self._fd = self._open()
+        self._writer = threading.Thread(target=self._write_loop, name='event-writer', daemon=True)
+        self._writer.start()
+
+    def _open(self):
+        try: # Only the process that creates the file writes the magic
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o644)
+            os.write(fd, MAGIC)
+            return fd
+        except FileExistsError:
+            pass
+        with open(self.path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"'{self.path}' is not an answer event log.")
+        return os.open(self.path, os.O_WRONLY | os.O_APPEND)
+
+    def record(self, learner, card_key, selected, correct, latency, submitted_at=None):
+        """Queues one answer event; returns immediately."""
+        key = self._learners.get(learner)
+        if key is None:
+            key = self._learners[learner] = learner_key(learner)
+        submitted_at = time.time() if submitted_at is None else submitted_at
+        self._queue.put((submitted_at, card_key, key, selected, latency, correct))
+
+    def flush(self, timeout=None):
+        """Blocks until everything queued so far is written."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _write_loop(self):
+        while True:
+            batch, waiters = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            # Collect until the batch is full, the interval has passed or a flush is requested
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    os.write(self._fd, self._pack(batch))
+                except OSError as e:
+                    print(f"Warning: Failed to log {len(batch)} answer event(s): {e}")
+            for waiter in waiters:
+                waiter.set()
+
+
+    @staticmethod
+    def _pack(batch):
+        """The batch as EVENT_DTYPE bytes; a record that doesn't fit the dtype is dropped alone."""
+        try:
+            return np.array(batch, dtype=EVENT_DTYPE).tobytes()
+        except (ValueError, OverflowError, TypeError):
+            pass
+        records = []
+        for event in batch:
+            try:
+                records.append(np.array(event, dtype=EVENT_DTYPE).tobytes())
+            except (ValueError, OverflowError, TypeError) as e:
+                print(f"Warning: Dropping answer event {event!r}: {e}")
+        return b''.join(records)
+
+
+def read_events(path=EVENT_LOG):
+    """All events in a log as a structured array (a trailing partial record is ignored)."""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"'{path}' is not an answer event log.")
+        size = os.fstat(f.fileno()).st_size - len(MAGIC)
+        return np.fromfile(f, dtype=EVENT_DTYPE, count=size // EVENT_DTYPE.itemsize)
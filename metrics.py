@@ -0,0 +1,217 @@
+# metrics.py
+# Process-wide performance counters and timings for the quiz app and the DOCX converter,
+# with export as JSON lines or a Prometheus text file.
+import collections
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+
+# --- Configuration ---
+RERUN_REPORT_EVERY = 50 # Log the rerun ratio after every N answered cards
+TIMING_WINDOW = 1024 # Most recent samples kept per timer for percentiles
+METRIC_PREFIX = 'flashcards' # Prefix of the exported Prometheus metric names
+EXPORT_INTERVAL = 15.0 # Seconds between periodic metric file writes
+
+
+class RerunStats:
+    """Counts script runs and answered cards, to track script runs per answered card.
+
+    Every widget interaction costs one run of app.py, so runs per answered card is the
+    server CPU cost of studying one card (page loads and chapter changes included).
+    """
+
+    def __init__(self, report_every=RERUN_REPORT_EVERY):
+        self._lock = threading.Lock() # Sessions run their scripts on separate threads
+        self.report_every = report_every
+        self.script_runs = 0
+        self.answered = 0
+
+    def record_run(self):
+        with self._lock:
+            self.script_runs += 1
+
+    def record_answer(self):
+        with self._lock:
+            self.answered += 1
+            report = self.report_every and self.answered % self.report_every == 0
+        if report:
+            print(self.summary())
+
+    def runs_per_answer(self):
+        """Script runs per answered card (None until a card has been answered)."""
+        with self._lock:
+            return self.script_runs / self.answered if self.answered else None
+
+    def summary(self):
+        ratio = self.runs_per_answer()
+        ratio_text = f"{ratio:.2f}" if ratio is not None else "n/a"
+        return f"Rerun stats: {self.script_runs} script runs, {self.answered} answered cards, {ratio_text} runs per card"
+
+
+# --- Timings ---
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    index = max(0, min(len(sorted_samples) - 1, int(round(fraction * len(sorted_samples))) - 1))
+    return sorted_samples[index]
+
+
+class Timings:
+    """Named latency timers. Keeps the last TIMING_WINDOW samples of each for p50/p95,
+    plus the all-time count and total."""
+
+    def __init__(self, window=TIMING_WINDOW):
+        self._lock = threading.Lock()
+        self.window = window
+        self._samples = {} # name -> deque of recent durations (seconds)
+        self._counts = collections.Counter()
+        self._totals = collections.Counter()
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        """Times the enclosed block (or decorated function) under `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = collections.deque(maxlen=self.window)
+            samples.append(seconds)
+            self._counts[name] += 1
+            self._totals[name] += seconds
+
+    def summary(self):
+        """{name: {'count', 'total', 'p50', 'p95', 'max'}} in seconds, sorted by name."""
+        with self._lock:
+            snapshot = {name: sorted(samples) for name, samples in self._samples.items()}
+            counts, totals = dict(self._counts), dict(self._totals)
+        return {name: {'count': counts[name], 'total': totals[name], 'p50': percentile(samples, 0.5),
+                       'p95': percentile(samples, 0.95), 'max': samples[-1]}
+                for name, samples in sorted(snapshot.items())}
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+            self._totals.clear()
+
+
+TIMINGS = Timings() # Shared by everything in this process (all app sessions, the converter)
+
+
+# --- Memory ---
+def memory_snapshot(limit=5):
+    """Traced memory and the top allocation sites, or None when tracemalloc is not tracing.
+
+    Tracing slows allocation-heavy code down noticeably, so it is only on when asked for
+    (tracemalloc.start(), the app's debug panel or the converter's --trace-memory).
+    """
+    if not tracemalloc.is_tracing():
+        return None
+    current, peak = tracemalloc.get_traced_memory()
+    stats = tracemalloc.take_snapshot().statistics('lineno')[:limit]
+    return {'current': current, 'peak': peak,
+            'top': [{'site': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                     'size': stat.size, 'count': stat.count} for stat in stats]}
+
+
+# --- Export ---
+def collect_metrics(timings=TIMINGS, rerun_stats=None, memory=None):
+    """One metrics record: timer summaries, rerun counters and an optional memory snapshot."""
+    record = {'time': time.time(), 'pid': os.getpid(), 'timings': timings.summary()}
+    if rerun_stats is not None:
+        record['reruns'] = {'script_runs': rerun_stats.script_runs, 'answered': rerun_stats.answered,
+                            'runs_per_answer': rerun_stats.runs_per_answer()}
+    if memory is not None:
+        record['memory'] = memory
+    return record
+
+
+def write_jsonl(path, record):
+    """Appends a metrics record to a JSON lines file."""
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+def prometheus_text(record):
+    """Renders a metrics record in the Prometheus text exposition format."""
+    name = f"{METRIC_PREFIX}_duration_seconds"
+    lines = [f"# HELP {name} Duration of instrumented sections.", f"# TYPE {name} summary"]
+    for section, stats in record['timings'].items():
+        label = f'section="{section}"'
+        lines.append(f'{name}{{{label},quantile="0.5"}} {stats["p50"]:.6f}')
+        lines.append(f'{name}{{{label},quantile="0.95"}} {stats["p95"]:.6f}')
+        lines.append(f'{name}_sum{{{label}}} {stats["total"]:.6f}')
+        lines.append(f'{name}_count{{{label}}} {stats["count"]}')
+    reruns = record.get('reruns')
+    if reruns:
+        lines += [f"# TYPE {METRIC_PREFIX}_script_runs_total counter",
+                  f"{METRIC_PREFIX}_script_runs_total {reruns['script_runs']}",
+                  f"# TYPE {METRIC_PREFIX}_answered_cards_total counter",
+                  f"{METRIC_PREFIX}_answered_cards_total {reruns['answered']}"]
+    memory = record.get('memory')
+    if memory:
+        lines += [f"# TYPE {METRIC_PREFIX}_traced_memory_bytes gauge",
+                  f'{METRIC_PREFIX}_traced_memory_bytes{{kind="current"}} {memory["current"]}',
+                  f'{METRIC_PREFIX}_traced_memory_bytes{{kind="peak"}} {memory["peak"]}']
+    return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(path, record):
+    """Writes a metrics record as a Prometheus text file (atomically, for textfile scrapers)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(prometheus_text(record))
+        os.chmod(tmp_path, 0o644) # mkstemp creates 0600; the scraper may run as another user
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class MetricsExporter:
+    """Writes this process's metrics to JSON lines and/or Prometheus files at most every
+    `interval` seconds; called from the app's script runs, so no extra thread is needed."""
+
+    def __init__(self, jsonl_path=None, prom_path=None, interval=EXPORT_INTERVAL):
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._last_export = float('-inf')
+
+    @property
+    def enabled(self):
+        return bool(self.jsonl_path or self.prom_path)
+
+    def export(self, rerun_stats=None):
+        """Writes the metrics files now."""
+        record = collect_metrics(rerun_stats=rerun_stats, memory=memory_snapshot())
+        try:
+            if self.jsonl_path:
+                write_jsonl(self.jsonl_path, record)
+            if self.prom_path:
+                write_prometheus(self.prom_path, record)
+        except OSError as e:
+            print(f"Warning: Could not write metrics: {e}")
+
+    def maybe_export(self, rerun_stats=None):
+        """Writes the metrics files if the export interval has passed."""
+        if not self.enabled:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_export < self.interval:
+                return
+            self._last_export = now
+        self.export(rerun_stats)
@@ -0,0 +1,100 @@
+# permutation.py
+# Seeded shuffles of range(n) in O(1) memory. Position i of the shuffle is computed on demand
+# by a small Feistel network over the smallest even-bit domain covering n; values that land
+# outside [0, n) are encrypted again (cycle walking), which keeps it a bijection on [0, n).
+# A quiz session therefore stores (seed, n, index) instead of a list of n card positions.
+import bisect
+
+# --- Configuration ---
+ROUNDS = 4 # Feistel rounds; four give a well-mixed order
+_MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15 # Spreads the round keys derived from one seed
+
+
+def _mix64(value):
+    """splitmix64 finalizer: a fast, well-distributed 64-bit hash."""
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+class SeededPermutation:
+    """A shuffled order of range(n) derived from `seed`, read like the list random.shuffle makes.
+
+    Supports len(), indexing, slicing and iteration; the same (n, seed) always gives the same order.
+    """
+    __slots__ = ('n', 'seed', '_half_bits', '_half_mask', '_round_keys')
+
+    def __init__(self, n, seed):
+        self.n = n
+        self.seed = seed
+        bits = max(2, (n - 1).bit_length())
+        bits += bits & 1 # Split into two equal halves; the domain is then smaller than 4n
+        self._half_bits = bits // 2
+        self._half_mask = (1 << self._half_bits) - 1
+        self._round_keys = tuple(_mix64((seed + r * _GOLDEN) & _MASK64) for r in range(ROUNDS))
+
+    def _encrypt(self, value):
+        left, right = value >> self._half_bits, value & self._half_mask
+        for key in self._round_keys:
+            left, right = right, left ^ (_mix64(right ^ key) & self._half_mask)
+        return (left << self._half_bits) | right
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.n))]
+        if index < 0:
+            index += self.n
+        if not 0 <= index < self.n:
+            raise IndexError("permutation index out of range")
+        value = self._encrypt(index)
+        while value >= self.n: # Under 4 steps on average, as the domain is under 4n
+            value = self._encrypt(value)
+        return value
+
+    def __iter__(self):
+        return (self[i] for i in range(self.n))
+
+    def __repr__(self):
+        return f"SeededPermutation(n={self.n}, seed={self.seed})"
+
+
+class PrefixedPermutation:
+    """A fixed `head` of distinct positions, then the rest of range(n) in a SeededPermutation order.
+
+    Holds only the head: the k-th position not in it is found by bisecting the sorted head, so
+    a session moved onto a reloaded deck keeps the cards it passed without listing all n.
+    """
+    __slots__ = ('head', 'n', 'seed', '_rest', '_gaps')
+
+    def __init__(self, head, n, seed):
+        self.head = list(head)
+        self.n = n
+        self.seed = seed
+        self._rest = SeededPermutation(n - len(self.head), seed)
+        # The k-th missing position is k + the number of sorted head values h[j] with h[j] - j <= k
+        self._gaps = [value - j for j, value in enumerate(sorted(self.head))]
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.n))]
+        if index < 0:
+            index += self.n
+        if not 0 <= index < self.n:
+            raise IndexError("permutation index out of range")
+        if index < len(self.head):
+            return self.head[index]
+        rank = self._rest[index - len(self.head)]
+        return rank + bisect.bisect_right(self._gaps, rank)
+
+    def __iter__(self):
+        return (self[i] for i in range(self.n))
+
+    def __repr__(self):
+        return f"PrefixedPermutation(head={len(self.head)} positions, n={self.n}, seed={self.seed})"
@@ -3,42 +3,162 @@ import docx
 import pandas as pd
 import re
 import os
+import argparse
+import contextlib
+import glob
+import hashlib
+import io
+import json
+import sys
+import time
+import tracemalloc
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from lxml import etree # Installed with python-docx
 from docx.enum.text import WD_COLOR_INDEX # Import the enum
+from docx.opc.exceptions import PackageNotFoundError
+from metrics import TIMINGS, collect_metrics, memory_snapshot, write_jsonl, write_prometheus
 
 # --- Configuration ---
 INPUT_DOCX = 'IOT MCQ.docx'
 OUTPUT_CSV = 'iot_flashcards_v2.csv'
 CHAPTER_HIGHLIGHT_COLOR = WD_COLOR_INDEX.GREEN # Enum value for Green
 ANSWER_HIGHLIGHT_COLOR = WD_COLOR_INDEX.YELLOW # Enum value for Yellow
+SOURCE_COL = 'Source' # Source file column added when several banks are merged
 
-# --- Helper Functions ---
-def get_paragraph_text(paragraph):
-    """Extracts full text from a paragraph, preserving runs."""
-    return "".join(run.text for run in paragraph.runs)
+# Patterns are compiled once here rather than on every paragraph
+QUESTION_PATTERN = re.compile(r"^\s*(\d+)\.\s*(.*)") # Matches "1. Question text"
+CHAPTER_PATTERN = re.compile(r"Chapter\s+(\d+)\s*-\s*(.*)", re.IGNORECASE) # Matches "Chapter 1 - Title"
+QUESTION_NUMBER_PREFIX = re.compile(r"^\s*\d+\.\s*") # Leading "1. " of a question
+OPTION_BULLET_PREFIX = re.compile(r"^\s*●\s*") # Leading bullet of an option
 
-def get_highlighted_text(paragraph, highlight_color):
-    """Extracts text with a specific highlight color from a paragraph."""
-    highlighted_runs = [run.text for run in paragraph.runs if run.font.highlight_color == highlight_color]
-    return "".join(highlighted_runs).strip()
+# WordprocessingML element names, for reading paragraphs straight from the XML
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+RELS_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+OFFICE_DOCUMENT_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+W_BODY, W_P, W_R = f'{{{W_NS}}}body', f'{{{W_NS}}}p', f'{{{W_NS}}}r'
+W_RPR, W_HIGHLIGHT, W_VAL = f'{{{W_NS}}}rPr', f'{{{W_NS}}}highlight', f'{{{W_NS}}}val'
+W_T, W_TAB, W_PTAB, W_BR, W_CR = (f'{{{W_NS}}}{tag}' for tag in ('t', 'tab', 'ptab', 'br', 'cr'))
+W_NO_BREAK_HYPHEN, W_TYPE = f'{{{W_NS}}}noBreakHyphen', f'{{{W_NS}}}type'
 
-def is_paragraph_highlighted(paragraph, highlight_color):
-    """Checks if any run in the paragraph has the specified highlight color."""
-    return any(run.font.highlight_color == highlight_color for run in paragraph.runs)
+# --- Paragraph Summary ---
+def _run_text(run):
+    """Same text python-docx's run.text gives: w:t text plus tab/break/hyphen equivalents."""
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == W_T:
+            parts.append(child.text or "")
+        elif tag == W_TAB or tag == W_PTAB:
+            parts.append("\t")
+        elif tag == W_CR:
+            parts.append("\n")
+        elif tag == W_BR:
+            parts.append("\n" if child.get(W_TYPE, 'textWrapping') == 'textWrapping' else "")
+        elif tag == W_NO_BREAK_HYPHEN:
+            parts.append("-")
+    return "".join(parts)
 
-# --- Main Parsing Logic ---
-def parse_docx(file_path):
-    """Parses the DOCX file to extract flashcard data based on highlighting."""
-    if not os.path.exists(file_path):
-        print(f"Error: File not found at {file_path}")
+
+def _run_highlight(run):
+    """Same value python-docx's run.font.highlight_color gives, read from w:rPr/w:highlight."""
+    rpr = run.find(W_RPR)
+    highlight = rpr.find(W_HIGHLIGHT) if rpr is not None else None
+    if highlight is None:
         return None
+    return WD_COLOR_INDEX.from_xml(highlight.get(W_VAL))
+
+
+class ParagraphSummary:
+    """Everything the parser needs from one paragraph, gathered in a single pass over its runs."""
+    __slots__ = ('text', 'highlights', 'spans')
+
+    def __init__(self, text, highlights, spans):
+        self.text = text # Full paragraph text (unstripped)
+        self.highlights = highlights # frozenset of the highlight colors present
+        self.spans = spans # (color, text) for each highlighted run, in order
+
+    def highlighted_text(self, highlight_color):
+        return "".join(text for color, text in self.spans if color == highlight_color).strip()
+
+
+def summarize_paragraph(p):
+    """Builds a ParagraphSummary from a w:p element (python-docx's paragraph._p or a streamed one).
+
+    Like python-docx's paragraph.runs, only the paragraph's direct w:r children count.
+    """
+    texts = []
+    highlights = set()
+    spans = []
+    for run in p.iterchildren(W_R):
+        text = _run_text(run)
+        texts.append(text)
+        color = _run_highlight(run)
+        if color is not None:
+            highlights.add(color)
+            spans.append((color, text))
+    return ParagraphSummary("".join(texts), frozenset(highlights), tuple(spans))
+
 
+# --- Paragraph Readers ---
+def iter_document_paragraphs(document):
+    """Yields a ParagraphSummary for each body paragraph of a loaded python-docx Document."""
+    for p in document.element.body.iterchildren(W_P):
+        yield summarize_paragraph(p)
+
+
+def _main_document_part(docx_zip):
+    """Finds the main document part name (normally word/document.xml) from the package rels."""
     try:
-        document = docx.Document(file_path)
-    except Exception as e:
-        print(f"Error opening DOCX file: {e}")
-        return None
+        rels = etree.fromstring(docx_zip.read('_rels/.rels'))
+        for rel in rels.iter(f'{{{RELS_NS}}}Relationship'):
+            if rel.get('Type') == OFFICE_DOCUMENT_REL:
+                return rel.get('Target').lstrip('/')
+    except KeyError:
+        pass
+    return 'word/document.xml'
+
+
+def iter_docx_paragraphs(file_path):
+    """Yields a ParagraphSummary for each body paragraph of a DOCX without building the document tree.
+
+    Reads the main document part straight from the zip with iterparse. Like python-docx's
+    document.paragraphs, only paragraphs directly under w:body are yielded (not ones in tables).
+    Each element is discarded once summarized.
+    """
+    with zipfile.ZipFile(file_path) as docx_zip:
+        with docx_zip.open(_main_document_part(docx_zip)) as xml_file:
+            for _, element in etree.iterparse(xml_file, events=('end',), tag=W_P):
+                parent = element.getparent()
+                if parent is None or parent.tag != W_BODY:
+                    continue # Paragraph inside a table/content control: freed with its body-level ancestor
+                yield summarize_paragraph(element)
+                # Free this paragraph and every body-level element before it (tables, section breaks)
+                element.clear()
+                while element.getprevious() is not None:
+                    del parent[0]
+
+
+# --- Main Parsing Logic ---
+def is_chapter_heading(para):
+    """True for a green-highlighted "Chapter N - Title" paragraph (only green ones are pattern-checked)."""
+    return CHAPTER_HIGHLIGHT_COLOR in para.highlights and CHAPTER_PATTERN.match(para.text.strip()) is not None
+
 
-    flashcards = []
+def _make_flashcard(chapter, question_number, question_text, options, correct_answers):
+    """Builds a flashcard row dict."""
+    return {
+        'Chapter': chapter,
+        'Question_No': question_number,
+        'Question': question_text.strip(),
+        'Options': "|".join(options),
+        'Correct Answer': ";;".join(correct_answers) # Join list with ;;
+    }
+
+
+def iter_flashcards(paragraphs):
+    """Yields flashcard dicts from a sequence of ParagraphSummary objects."""
     current_chapter = "Unknown"
     current_question_text = ""
     current_options = []
@@ -46,29 +166,16 @@ def parse_docx(file_path):
     question_number = 0
     parsing_options = False # Flag to indicate we are looking for options
 
-    question_pattern = re.compile(r"^\s*(\d+)\.\s*(.*)") # Matches "1. Question text"
-
-    print("Starting DOCX parsing...")
-
-    for i, para in enumerate(document.paragraphs):
-        para_text = get_paragraph_text(para).strip()
+    for para in paragraphs:
+        para_text = para.text.strip()
         if not para_text: # Skip empty paragraphs
             continue
 
         # --- Detect Chapter ---
-        is_green_highlighted = is_paragraph_highlighted(para, CHAPTER_HIGHLIGHT_COLOR)
-        chapter_match = re.match(r"Chapter\s+(\d+)\s*-\s*(.*)", para_text, re.IGNORECASE)
-
-        if is_green_highlighted and chapter_match:
+        if is_chapter_heading(para):
              # Finalize previous question before starting new chapter
             if current_question_text and current_options and current_correct_answers: # Check list instead of single answer
-                flashcards.append({
-                    'Chapter': current_chapter,
-                    'Question_No': question_number,
-                    'Question': current_question_text.strip(),
-                    'Options': "|".join(current_options),
-                    'Correct Answer': ";;".join(current_correct_answers) # Join list with ;;
-                })
+                yield _make_flashcard(current_chapter, question_number, current_question_text, current_options, current_correct_answers)
             # Reset for next question/chapter
             current_question_text = ""
             current_options = []
@@ -80,94 +187,82 @@ def parse_docx(file_path):
             continue # Move to next paragraph after finding chapter
 
         # --- Detect Question ---
-        question_match = question_pattern.match(para_text)
+        question_match = QUESTION_PATTERN.match(para_text)
         if question_match:
              # Finalize previous question before starting new one
             if current_question_text and current_options and current_correct_answers: # Check list
-                 flashcards.append({
-                    'Chapter': current_chapter,
-                    'Question_No': question_number,
-                    'Question': current_question_text.strip(),
-                    'Options': "|".join(current_options),
-                    'Correct Answer': ";;".join(current_correct_answers) # Join list with ;;
-                })
+                yield _make_flashcard(current_chapter, question_number, current_question_text, current_options, current_correct_answers)
 
             # Start new question
             question_number = int(question_match.group(1))
-            # Combine text from all runs in the paragraph for the question
-            current_question_text = "".join(run.text for run in para.runs).strip()
             # Remove the leading number and period
-            current_question_text = re.sub(r"^\s*\d+\.\s*", "", current_question_text).strip()
+            current_question_text = QUESTION_NUMBER_PREFIX.sub("", para_text).strip()
 
             current_options = []
             current_correct_answers = [] # Reset list
             parsing_options = True # Assume options follow immediately
-            # print(f"Q{question_number}: {current_question_text}")
             continue # Check next paragraph for options
 
         # --- Detect Options ---
         # This assumes options are typically in paragraphs immediately following the question
-        # and continues until a new chapter or question is detected.
+        # and continues until a new chapter or question is detected (both handled above).
         if parsing_options:
-            is_yellow_highlighted = is_paragraph_highlighted(para, ANSWER_HIGHLIGHT_COLOR)
-            # Combine text from all runs in the paragraph for the option
-            option_text = "".join(run.text for run in para.runs).strip()
-
-            # Basic check to stop collecting options if it looks like a new chapter/question start
-            is_new_chapter = chapter_match and is_paragraph_highlighted(para, CHAPTER_HIGHLIGHT_COLOR)
-            is_new_question = question_pattern.match(option_text)
-
-            if is_new_chapter or is_new_question:
-                 # Finalize the current question before moving on
-                if current_question_text and current_options and current_correct_answers: # Check list
-                    flashcards.append({
-                        'Chapter': current_chapter,
-                        'Question_No': question_number,
-                        'Question': current_question_text.strip(),
-                        'Options': "|".join(current_options),
-                        'Correct Answer': ";;".join(current_correct_answers) # Join list with ;;
-                    })
-                # Reset state as we've hit something that isn't an option
-                current_question_text = ""
-                current_options = []
-                current_correct_answers = [] # Reset list
-                parsing_options = False
-                # Re-process the current paragraph if it was a chapter/question start
-                if is_new_chapter:
-                     current_chapter = para_text
-                     print(f"--- Found Chapter: {current_chapter} ---")
-                elif is_new_question:
-                    q_match_rerun = question_pattern.match(option_text) # Need to re-match
-                    question_number = int(q_match_rerun.group(1))
-                    current_question_text = "".join(run.text for run in para.runs).strip()
-                    current_question_text = re.sub(r"^\s*\d+\.\s*", "", current_question_text).strip()
-                    current_options = []
-                    current_correct_answers = [] # Reset list
-                    parsing_options = True # Start parsing options for this new question
-                continue # Move processing to the next paragraph
-
-
             # Clean option text (e.g., remove potential leading bullets)
-            option_text_cleaned = re.sub(r"^\s*●\s*", "", option_text).strip()
+            option_text_cleaned = OPTION_BULLET_PREFIX.sub("", para_text).strip()
 
             if option_text_cleaned: # Add if it's not empty
                 current_options.append(option_text_cleaned)
-                # print(f"  Opt: {option_text_cleaned}")
-                if is_yellow_highlighted:
+                if ANSWER_HIGHLIGHT_COLOR in para.highlights:
                     # Append all yellow highlighted options to the list
                     current_correct_answers.append(option_text_cleaned)
-                    # print(f"    -> Correct Answer Found: {option_text_cleaned}")
 
 
     # Add the last processed question after the loop finishes
     if current_question_text and current_options and current_correct_answers: # Check list
-        flashcards.append({
-            'Chapter': current_chapter,
-            'Question_No': question_number,
-            'Question': current_question_text.strip(),
-            'Options': "|".join(current_options),
-            'Correct Answer': ";;".join(current_correct_answers) # Join list with ;;
-        })
+        yield _make_flashcard(current_chapter, question_number, current_question_text, current_options, current_correct_answers)
+
+
+def stream_flashcards(file_path):
+    """Generator of flashcard dicts that streams the DOCX instead of loading the whole document."""
+    return iter_flashcards(iter_docx_paragraphs(file_path))
+
+
+@TIMINGS.timer('parse_docx')
+def parse_docx(file_path, streaming=False, cache=None):
+    """Parses the DOCX file to extract flashcard data based on highlighting.
+
+    With streaming=True the document XML is read incrementally (see iter_docx_paragraphs)
+    instead of through python-docx; the output is the same. With a ConversionCache, unchanged
+    files and unchanged chapter sections are served from the cache instead of being re-parsed.
+    """
+    if not os.path.exists(file_path):
+        print(f"Error: File not found at {file_path}")
+        return None
+
+    print("Starting DOCX parsing...")
+
+    if streaming:
+        read_paragraphs = lambda: iter_docx_paragraphs(file_path)
+    else:
+        try:
+            document = docx.Document(file_path) if cache is None else None # Opened lazily on a cache miss
+        except Exception as e:
+            print(f"Error opening DOCX file: {e}")
+            return None
+        read_paragraphs = lambda: iter_document_paragraphs(document or docx.Document(file_path))
+
+    try:
+        if cache is not None:
+            flashcards = cache.flashcards(file_path, read_paragraphs)
+            print(f"Cache: {cache.last_status}")
+        else:
+            flashcards = list(iter_flashcards(read_paragraphs()))
+    except (zipfile.BadZipFile, KeyError, etree.XMLSyntaxError) as e:
+        print(f"Error reading DOCX file: {e}")
+        return None
+    except PackageNotFoundError as e:
+        print(f"Error opening DOCX file: {e}")
+        return None
 
     print(f"Parsing complete. Found {len(flashcards)} potential flashcards.")
 
@@ -184,15 +279,241 @@ def parse_docx(file_path):
     return final_df[['Chapter', 'Question_No', 'Question', 'Options', 'Correct Answer']] # Ensure column order
 
 
-# --- Execution ---
-if __name__ == "__main__":
-    df_flashcards = parse_docx(INPUT_DOCX)
+# --- Conversion Cache ---
+CACHE_DIR = '.docx_cache'
+CACHE_VERSION = 1 # Bump whenever the parsing rules change, so cached flashcards are not reused
+
+
+def file_sha256(file_path):
+    """Returns the hex SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def split_chapter_sections(paragraphs):
+    """Groups paragraph summaries into sections that each start at a chapter heading.
+
+    The parser resets all its state at a chapter heading, so every section parses the same
+    on its own as it does inside the whole document. The first section holds whatever comes
+    before the first chapter.
+    """
+    section = []
+    for para in paragraphs:
+        if section and is_chapter_heading(para):
+            yield section
+            section = []
+        section.append(para)
+    if section:
+        yield section
+
+
+def section_hash(section):
+    """Content hash of a section: each paragraph's text and highlight colors, plus the cache version."""
+    digest = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+    for para in section:
+        colors = ",".join(sorted(str(int(color)) for color in para.highlights))
+        digest.update(f"{para.text}\x1f{colors}\x1e".encode('utf-8'))
+    return digest.hexdigest()
 
-    if df_flashcards is not None and not df_flashcards.empty:
+
+class ConversionCache:
+    """On-disk cache of parsed flashcards, content-addressed at two levels.
+
+    files/<sha256 of the DOCX>.json lists the file's chapter section hashes in order, and
+    sections/<section hash>.json holds that section's flashcards. An unchanged file costs one
+    hash; in a changed file only sections whose content changed are run through the parser.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.last_status = None # What the last flashcards() call reused or re-parsed
+        for sub in ('files', 'sections'):
+            os.makedirs(os.path.join(cache_dir, sub), exist_ok=True)
+
+    def _path(self, kind, key):
+        return os.path.join(self.cache_dir, kind, f"{key}.json")
+
+    def _read(self, kind, key):
         try:
-            df_flashcards.to_csv(OUTPUT_CSV, index=False, encoding='utf-8')
-            print(f"Successfully saved flashcards to {OUTPUT_CSV}")
-        except Exception as e:
-            print(f"Error saving DataFrame to CSV: {e}")
-    else:
-        print("Failed to extract flashcards or DataFrame is empty.")
+            with open(self._path(kind, key), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None # Missing or corrupt entries are simply misses
+
+    def _write(self, kind, key, data):
+        # Write then rename, so parallel workers never read a partial entry
+        path = self._path(kind, key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def flashcards(self, file_path, read_paragraphs):
+        """Returns the flashcard dicts for file_path; read_paragraphs() is only called on a miss."""
+        content_hash = file_sha256(file_path)
+        entry = self._read('files', content_hash)
+        # An entry written by another CACHE_VERSION is a miss (its section keys are from other rules)
+        if entry is not None and entry.get('version') == CACHE_VERSION:
+            sections = [self._read('sections', key) for key in entry['sections']]
+            if all(cards is not None for cards in sections):
+                self.last_status = "unchanged file, nothing re-parsed"
+                return [card for cards in sections for card in cards]
+
+        flashcards = []
+        section_keys = []
+        reparsed = 0
+        for section in split_chapter_sections(read_paragraphs()):
+            key = section_hash(section)
+            cards = self._read('sections', key)
+            if cards is None:
+                cards = list(iter_flashcards(section))
+                self._write('sections', key, cards)
+                reparsed += 1
+            section_keys.append(key)
+            flashcards.extend(cards)
+        self._write('files', content_hash, {'version': CACHE_VERSION, 'sections': section_keys})
+        self.last_status = f"re-parsed {reparsed} of {len(section_keys)} chapter section(s)"
+        return flashcards
+
+
+# --- Batch Conversion ---
+def expand_inputs(patterns):
+    """Resolves files, directories (their *.docx) and glob patterns to an ordered list of DOCX paths."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(glob.glob(os.path.join(pattern, '*.docx')))
+        elif glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            matches = [pattern] # Plain path; parse_docx reports it if missing
+        # Skip Word's "~$name.docx" lock files
+        paths.extend(path for path in matches if not os.path.basename(path).startswith('~$'))
+    return list(dict.fromkeys(paths)) # Drop duplicates, keep order
+
+
+ConversionResult = namedtuple('ConversionResult', 'file_path df seconds log cache_status')
+
+
+def convert_file(file_path, streaming=False, cache_dir=None):
+    """Parses one DOCX with its progress output captured into the result's log."""
+    log = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(log):
+        cache = ConversionCache(cache_dir) if cache_dir else None
+        df = parse_docx(file_path, streaming=streaming, cache=cache)
+    cache_status = cache.last_status if cache else None
+    return ConversionResult(file_path, df, time.perf_counter() - start, log.getvalue(), cache_status)
+
+
+def convert_batch(file_paths, workers=None, streaming=False, cache_dir=None):
+    """Parses many DOCX files, one parse_docx per worker process. Yields ConversionResults as they finish."""
+    if workers == 1 or len(file_paths) <= 1:
+        for file_path in file_paths:
+            yield convert_file(file_path, streaming, cache_dir)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(convert_file, file_path, streaming, cache_dir) for file_path in file_paths]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def save_csv(df, output_path):
+    """Writes a flashcard frame to CSV, reporting success or failure."""
+    try:
+        df.to_csv(output_path, index=False, encoding='utf-8')
+        print(f"Successfully saved flashcards to {output_path}")
+        return True
+    except Exception as e:
+        print(f"Error saving DataFrame to CSV: {e}")
+        return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert highlighted DOCX question banks to flashcard CSVs.")
+    parser.add_argument('inputs', nargs='*', default=[INPUT_DOCX],
+                        help=f"DOCX files, directories or glob patterns (default: {INPUT_DOCX})")
+    parser.add_argument('-o', '--output', default=OUTPUT_CSV, help=f"Merged output CSV (default: {OUTPUT_CSV})")
+    parser.add_argument('--output-dir', help="Write one CSV per input into this directory instead of merging")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help="Worker processes (default: CPU count)")
+    parser.add_argument('--stream', action='store_true', help="Stream the document XML instead of loading it with python-docx (low memory)")
+    parser.add_argument('--cache-dir', default=CACHE_DIR, help=f"Parsed flashcard cache (default: {CACHE_DIR})")
+    parser.add_argument('--no-cache', action='store_true', help="Re-parse every file from scratch")
+    parser.add_argument('--metrics-jsonl', help="Append timing/memory metrics of this run to a JSON lines file")
+    parser.add_argument('--metrics-prom', help="Write timing/memory metrics of this run as a Prometheus text file")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Record tracemalloc memory in the metrics (covers this process, not worker processes)")
+    args = parser.parse_args(argv)
+    if args.trace_memory:
+        tracemalloc.start()
+
+    file_paths = expand_inputs(args.inputs)
+    if not file_paths:
+        print("Error: No DOCX files matched the given inputs.")
+        return 1
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    print(f"Converting {len(file_paths)} file(s) with {min(args.workers or 1, len(file_paths))} worker(s)...")
+    batch_start = time.perf_counter()
+    results = {}
+    converted = total_cards = 0
+    cache_dir = None if args.no_cache else args.cache_dir
+    for file_path, df, seconds, log, cache_status in convert_batch(file_paths, args.workers, args.stream, cache_dir):
+        if df is None or df.empty:
+            # Show the parser's last message (e.g. "Error: File not found") for failed files
+            reason = log.strip().splitlines()[-1] if log.strip() else "no flashcards extracted"
+            print(f"  {file_path}: FAILED in {seconds:.2f}s ({reason})")
+            continue
+        print(f"  {file_path}: {len(df)} cards in {seconds:.2f}s" + (f" ({cache_status})" if cache_status else ""))
+        TIMINGS.record('convert_file', seconds) # parse_docx itself is timed in whichever process ran it
+        converted += 1
+        total_cards += len(df)
+        if args.output_dir:
+            save_csv(df, os.path.join(args.output_dir, os.path.splitext(os.path.basename(file_path))[0] + '.csv'))
+        else:
+            results[file_path] = df
+    elapsed = time.perf_counter() - batch_start
+
+    if not args.output_dir:
+        if not results:
+            print("Failed to extract flashcards or DataFrame is empty.")
+            return 1
+        if len(file_paths) == 1:
+            merged = next(iter(results.values()))
+        else:
+            # Merge in input order, recording where each card came from
+            merged = pd.concat(
+                [results[path].assign(**{SOURCE_COL: os.path.basename(path)}) for path in file_paths if path in results],
+                ignore_index=True,
+            )
+        if not save_csv(merged, args.output):
+            return 1
+
+    print(f"Done: {total_cards} cards from {converted}/{len(file_paths)} file(s) in {elapsed:.2f}s"
+          f" ({len(file_paths) / elapsed:.1f} files/s)")
+    TIMINGS.record('convert_batch', elapsed)
+    write_metrics(args.metrics_jsonl, args.metrics_prom)
+    return 0 if converted else 1
+
+
+def write_metrics(jsonl_path=None, prom_path=None):
+    """Exports the run's timings (and traced memory, if enabled) to the requested files."""
+    if not (jsonl_path or prom_path):
+        return
+    record = collect_metrics(memory=memory_snapshot())
+    try:
+        if jsonl_path:
+            write_jsonl(jsonl_path, record)
+        if prom_path:
+            write_prometheus(prom_path, record)
+    except OSError as e:
+        print(f"Warning: Could not write metrics: {e}")
+
+
+# --- Execution ---
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,388 @@
+# quiz.py
+# Streamlit-free quiz logic: chapter filtering, card order, answer checking, scoring and
+# spaced-repetition scheduling. app.py keeps one QuizSession per browser session; load tests
+# and other front ends drive the same API.
+import collections
+import random
+import threading
+import time
+
+import numpy as np
+
+from deck import CARD_KEY_DTYPE, DeckView
+from permutation import PrefixedPermutation, SeededPermutation
+from scheduler import ReviewState, Scheduler, grade_review
+
+# --- Configuration ---
+STATE_VERSION = 6 # Layout of QuizSession.to_state() (2: adds deck and order, 3: card_shown_at, 4: permutation order, 5: card filter, 6: order as head and seed)
+RECENT_REVIEWS = 64 # Reviews kept in the session state until the review store has surely committed them
+
+
+def follow_keys(sorted_keys, sorter, keys):
+    """Positions of `keys` in the array sorted by `sorter` (sorted_keys = array[sorter]); -1 where missing."""
+    if len(sorted_keys) == 0:
+        return np.full(len(keys), -1, dtype=np.int64)
+    slots = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return np.where(sorted_keys[slots] == keys, sorter[slots], -1)
+
+
+class AnswerResult:
+    """Outcome of one submitted answer."""
+    __slots__ = ('card', 'selection', 'mask', 'is_correct')
+
+    def __init__(self, card, selection):
+        self.card = card
+        self.selection = selection # As submitted: an option bitmask, an option, or a list of options
+        if isinstance(selection, int):
+            if not 0 <= selection < 1 << len(card.options):
+                raise ValueError(f"Selection bitmask {selection} is out of range for {len(card.options)} options.")
+            self.mask = selection
+        elif selection is None:
+            self.mask = 0
+        elif isinstance(selection, str):
+            self.mask = card.options_mask((selection,))
+        else:
+            self.mask = card.options_mask(frozenset(selection))
+        self.is_correct = self.mask == card.answer_mask
+
+    @property
+    def selected(self):
+        """The selected options, as a set of option strings."""
+        return frozenset(self.card.mask_options(self.mask))
+
+
+class QuizEngine:
+    """Process-wide quiz backend: the shared read-only deck, the review store and the event log.
+
+    Holds no per-learner state, so one engine can serve any number of sessions and threads.
+    The deck can be replaced while sessions are live (see swap_deck).
+    """
+
+    def __init__(self, deck, review_store=None, event_log=None):
+        self._deck = (1, deck) # (version, deck), replaced as a whole so readers always see a matching pair
+        self._swap_lock = threading.Lock()
+        self.review_store = review_store
+        self.event_log = event_log
+
+    @property
+    def deck(self):
+        return self._deck[1]
+
+    @property
+    def deck_version(self):
+        return self._deck[0]
+
+    def current_deck(self):
+        """Returns (version, deck) of the deck in use."""
+        return self._deck
+
+    def swap_deck(self, deck):
+        """Installs a reloaded deck and returns its version.
+
+        Sessions move onto it, following their cards by key, the next time they are used.
+        """
+        with self._swap_lock:
+            version = self._deck[0] + 1
+            self._deck = (version, deck)
+        return version
+
+    @property
+    def chapters(self):
+        return self.deck.chapters
+
+    def load_states(self, learner):
+        """Stored review states of a learner ({} without a review store)."""
+        return self.review_store.load_states(learner) if self.review_store is not None else {}
+
+    def load_state(self, learner, card_key):
+        """Stored review state of one card (a new ReviewState if there is none)."""
+        state = self.review_store.load_state(learner, card_key) if self.review_store is not None else None
+        return ReviewState() if state is None else state
+
+    def record_review(self, learner, card_key, state, correct, reviewed_at):
+        if self.review_store is not None:
+            self.review_store.record(learner, card_key, state, correct, reviewed_at)
+
+    def record_answer(self, learner, card_key, selected, correct, latency, submitted_at):
+        if self.event_log is not None:
+            self.event_log.record(learner, card_key, selected, correct, latency, submitted_at)
+
+    def new_session(self, selected_chapters, learner='local', spaced_repetition=False, seed=None, card_filter=None):
+        return QuizSession(self, selected_chapters, learner, spaced_repetition, seed, card_filter)
+
+    def restore_session(self, state):
+        return QuizSession.from_state(self, state)
+
+
+class QuizSession:
+    """One learner's quiz over a chapter selection: card order, progress, score and schedule.
+
+    The current card is either the next one in the shuffled order or, with spaced_repetition,
+    the one the scheduler picks (kept until next() so every rerun shows the same card).
+    The shuffle is a SeededPermutation of `seed`, so to_state() is a small dict that from_state()
+    can rebuild the session from in another process. When the engine's deck is reloaded the
+    session carries its progress over to the new deck on its next access (see _remap).
+    """
+
+    def __init__(self, engine, selected_chapters, learner='local', spaced_repetition=False, seed=None, card_filter=None):
+        self.engine = engine
+        self.learner = learner
+        self.spaced_repetition = spaced_repetition
+        # Optional card keys (e.g. search results) the quiz is limited to within the chapters
+        self.card_filter = None if card_filter is None else np.asarray(card_filter, dtype=CARD_KEY_DTYPE)
+        # This session's latest reviews, newest last, as (card_key, ease, interval, repetitions, lapses, due)
+        self.recent_reviews = collections.deque(maxlen=RECENT_REVIEWS)
+        self.reset(selected_chapters, seed)
+
+    def reset(self, selected_chapters=None, seed=None):
+        """Starts over with a new shuffle, optionally with a new chapter selection."""
+        if selected_chapters is not None:
+            self.selected_chapters = list(selected_chapters)
+        self.seed = random.getrandbits(63) if seed is None else seed
+        self._build()
+        self.index = 0 # Position in self.order
+        self.review_card = None # Card picked by the scheduler
+        self.correct_count = 0
+        self.total_answered = 0
+        self.last_result = None # AnswerResult of the current card once submitted
+        self.card_shown_at = time.time() # For the answer latency in the event log
+
+    def _build(self, carried=None, deck_state=None):
+        """Derives the filtered view and shuffled order from the selection and seed.
+
+        `carried` = (head, seed) starts the order with the positions in head and shuffles the rest
+        by seed (for a session carried over from another deck version, see _remap).
+        """
+        self.deck_version, source = deck_state or self.engine.current_deck()
+        # The session keeps only the matching deck positions (a union of per-chapter id arrays);
+        # a sharded deck loads just the selected chapters and hands back a deck of those
+        deck, card_ids = self._select(source)
+        self.deck = deck
+        self.view = DeckView(deck.cards, card_ids)
+        self.custom_order = carried is not None
+        # A seeded shuffle of positions within the filtered cards, computed per position,
+        # so the session holds no per-card list however many cards are selected
+        if carried is None:
+            self.order = SeededPermutation(len(self.view), self.seed)
+        else:
+            self.order = PrefixedPermutation(carried[0], len(self.view), carried[1])
+        self._scheduler = None # Built on first use (see scheduler)
+
+    @property
+    def scheduler(self):
+        """Spaced-repetition index over the same cards, built the first time spaced repetition needs it.
+
+        Stored reviews go into the due heap, unseen cards are served in the shuffled order.
+        """
+        if self._scheduler is None:
+            self._scheduler = Scheduler(self.deck.card_keys[self.view.card_ids], self._review_states(), new_order=self.order)
+        return self._scheduler
+
+    def _select(self, source):
+        """(deck, card_ids) of this session's cards in `source`: the selected chapters, narrowed
+        to card_filter if there is one."""
+        deck, card_ids = source.select(self.selected_chapters)
+        if self.card_filter is not None:
+            card_ids = card_ids[np.isin(deck.card_keys[card_ids], self.card_filter)]
+        return deck, card_ids
+
+    def _review_states(self):
+        """The learner's stored review states, overlaid with this session's latest reviews.
+
+        The review store commits in the background, so those may not be stored yet.
+        """
+        states = self.engine.load_states(self.learner)
+        for card_key, *fields in self.recent_reviews:
+            states[card_key] = ReviewState(*fields)
+        return states
+
+    def _review_state(self, card_key):
+        """The learner's review state of one card (this session's latest review, else the stored one)."""
+        for key, *fields in reversed(self.recent_reviews):
+            if key == card_key:
+                return ReviewState(*fields)
+        return self.engine.load_state(self.learner, card_key)
+
+    def _sync(self):
+        if self.engine.deck_version != self.deck_version:
+            self._remap(self.engine.current_deck())
+
+    def _remap(self, deck_state):
+        """Moves the session onto a reloaded deck, following its cards by their stable key.
+
+        Cards already passed stay passed and the current card (with its answer) stays current,
+        as long as they are still in the deck; cards new to the selection are shuffled into the
+        part of the order not reached yet. Score and review history are kept.
+        """
+        old_keys = self.deck.card_keys[self.view.card_ids] # Key of each old position
+        ahead = self.order[self.index] if self.index < len(self.order) else None # Next card in the order
+        current = self.review_card if self.spaced_repetition else ahead # The card last_result belongs to
+
+        version, source = deck_state
+        deck, card_ids = self._select(source)
+        new_keys = deck.card_keys[card_ids]
+        # Old positions -> new positions by one sorted lookup over the new keys, not a dict of every card
+        sorter = np.argsort(new_keys, kind='stable')
+        sorted_keys = new_keys[sorter]
+
+        def follow(positions):
+            """New positions of the cards at old `positions` (-1 for a card no longer selected)."""
+            return follow_keys(sorted_keys, sorter, old_keys[np.asarray(positions, dtype=np.int64)])
+
+        def follow_one(position):
+            new = -1 if position is None else int(follow([position])[0])
+            return None if new < 0 else new
+
+        passed = follow(self.order[:self.index])
+        passed = list(dict.fromkeys(passed[passed >= 0].tolist())) # Cards sharing a key land on one position
+        ahead, current, review_card = follow_one(ahead), follow_one(current), follow_one(self.review_card)
+        # The card ahead stays next (if it survived); the other cards not passed are shuffled after it
+        head = passed if ahead is None or ahead in passed else passed + [ahead]
+
+        last = self.last_result
+        self._build((head, self.seed ^ version), deck_state)
+        self.index = len(passed)
+        self.review_card = review_card
+        self.last_result = None if last is None or current is None else AnswerResult(self.view.card(current), last.selection)
+
+    def to_state(self):
+        """JSON-serializable snapshot of the session (see from_state)."""
+        self._sync()
+        last = self.last_result
+        return {
+            'version': STATE_VERSION,
+            'deck': self.deck.fingerprint,
+            'learner': self.learner,
+            'chapters': self.selected_chapters,
+            'cards': None if self.card_filter is None else self.card_filter.tolist(),
+            'spaced_repetition': self.spaced_repetition,
+            'seed': self.seed,
+            # Normally derived from the seed; after a deck reload, the carried head and its seed
+            'order': {'head': self.order.head, 'seed': self.order.seed} if self.custom_order else None,
+            'index': self.index,
+            'review_card': self.review_card,
+            'correct_count': self.correct_count,
+            'total_answered': self.total_answered,
+            'last_result': None if last is None else {'position': self.current_position(), 'selection': last.selection},
+            'card_shown_at': self.card_shown_at,
+            'recent_reviews': [list(review) for review in self.recent_reviews],
+        }
+
+    @classmethod
+    def from_state(cls, engine, state):
+        """Rebuilds a session saved with to_state(), e.g. by another worker process.
+
+        A state saved against another version of the deck (another worker reloaded it first)
+        can't be placed on this one: it keeps its score and reviews but starts a new pass.
+        """
+        if state.get('version') != STATE_VERSION:
+            raise ValueError(f"Unsupported quiz session state version: {state.get('version')!r}")
+        session = cls.__new__(cls)
+        session.engine = engine
+        session.learner = state['learner']
+        session.spaced_repetition = state['spaced_repetition']
+        session.selected_chapters = list(state['chapters'])
+        session.card_filter = None if state['cards'] is None else np.asarray(state['cards'], dtype=CARD_KEY_DTYPE)
+        session.seed = state['seed']
+        session.recent_reviews = collections.deque((tuple(review) for review in state['recent_reviews']), maxlen=RECENT_REVIEWS)
+        deck_state = engine.current_deck()
+        same_deck = state['deck'] == deck_state[1].fingerprint
+        carried = state['order'] and (state['order']['head'], state['order']['seed'])
+        session._build(carried if same_deck else None, deck_state)
+        session.correct_count = state['correct_count']
+        session.total_answered = state['total_answered']
+        session.card_shown_at = state['card_shown_at']
+        if not same_deck:
+            session.index, session.review_card, session.last_result = 0, None, None
+            return session
+        session.index = state['index']
+        session.review_card = state['review_card']
+        last = state['last_result']
+        session.last_result = None if last is None else AnswerResult(session.view.card(last['position']), last['selection'])
+        return session
+
+    def __len__(self):
+        self._sync()
+        return len(self.view)
+
+    @property
+    def empty(self):
+        self._sync()
+        return self.view.empty
+
+    @property
+    def answered(self):
+        return self.last_result is not None
+
+    def current_position(self, now=None):
+        """Position (within the filtered cards) of the card to show, or None when there is none."""
+        self._sync()
+        if self.spaced_repetition:
+            if self.review_card is None:
+                now = time.time() if now is None else now
+                self.review_card = self.scheduler.next_card(now)
+                if self.review_card is not None:
+                    self.card_shown_at = now # A due card may be picked long after next()
+            return self.review_card
+        if self.index < len(self.order):
+            return self.order[self.index]
+        return None
+
+    def set_spaced_repetition(self, enabled):
+        """Switches between shuffled order and scheduler order; this leaves the current card."""
+        if enabled != self.spaced_repetition:
+            self.spaced_repetition = enabled
+            self.review_card = None
+            self.last_result = None
+            self.card_shown_at = time.time()
+
+    def card(self, position):
+        return self.view.card(position)
+
+    def current_card(self, now=None):
+        position = self.current_position(now)
+        return None if position is None else self.view.card(position)
+
+    def submit(self, selection, now=None):
+        """Grades `selection` for the current card, updates the score and schedules the card.
+
+        `selection` is an option bitmask (see Card), an option or a list of options.
+        Submitting again before next() returns the first result unchanged.
+        """
+        if self.last_result is not None:
+            return self.last_result
+        position = self.current_position(now)
+        if position is None:
+            raise ValueError("There is no current card to answer.")
+        result = AnswerResult(self.view.card(position), selection)
+        self.total_answered += 1
+        if result.is_correct:
+            self.correct_count += 1
+
+        # Reschedule the card and queue the review for the store's background writer
+        now = time.time() if now is None else now
+        if self._scheduler is not None:
+            card_key, state = self._scheduler.review(position, result.is_correct, now)
+        else: # Shuffled order only: grade the card's own state instead of building the scheduler
+            card_key = self.view.card(position).key
+            state = grade_review(self._review_state(card_key), result.is_correct, now)
+        self.engine.record_review(self.learner, card_key, state, result.is_correct, now)
+        self.engine.record_answer(self.learner, card_key, result.mask, result.is_correct, now - self.card_shown_at, now)
+        self.recent_reviews.append((card_key, state.ease, state.interval, state.repetitions, state.lapses, state.due))
+        self.last_result = result
+        return result
+
+    def next(self):
+        """Moves on to the next card."""
+        if self.spaced_repetition:
+            self.review_card = None # Ask the scheduler again
+        else:
+            self.index += 1
+        self.last_result = None
+        self.card_shown_at = time.time()
+
+    def new_remaining(self):
+        return self.scheduler.new_remaining()
+
+    def next_due_time(self):
+        return self.scheduler.next_due_time()
@@ -0,0 +1,224 @@
+# scheduler.py
+# SM-2 spaced-repetition scheduling: per-card review state, a heap of due cards, and a
+# SQLite review store whose writes are batched on a background thread.
+import heapq
+import queue
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+# --- Configuration ---
+REVIEW_DB = 'reviews.sqlite3'
+DAY = 86400.0 # Seconds
+RELEARN_DELAY = 600.0 # A missed card comes back after 10 minutes
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+CORRECT_QUALITY = 4 # SM-2 grades (0-5) used for a correct / incorrect answer
+INCORRECT_QUALITY = 1
+
+
+# --- SM-2 ---
+class ReviewState:
+    """Scheduling state of one card for one learner."""
+    __slots__ = ('ease', 'interval', 'repetitions', 'lapses', 'due')
+
+    def __init__(self, ease=DEFAULT_EASE, interval=0.0, repetitions=0, lapses=0, due=0.0):
+        self.ease = ease # SM-2 easiness factor
+        self.interval = interval # Days until the next review
+        self.repetitions = repetitions # Consecutive correct reviews
+        self.lapses = lapses # Times the card was forgotten
+        self.due = due # Epoch seconds
+
+
+def sm2_review(state, quality, now):
+    """Returns the new ReviewState after a review graded `quality` (0-5) at time `now`."""
+    ease = max(MIN_EASE, state.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    if quality < 3:
+        return ReviewState(ease, 0.0, 0, state.lapses + 1, now + RELEARN_DELAY)
+    repetitions = state.repetitions + 1
+    if repetitions == 1:
+        interval = 1.0
+    elif repetitions == 2:
+        interval = 6.0
+    else:
+        interval = round(state.interval * ease, 2)
+    return ReviewState(ease, interval, repetitions, state.lapses, now + interval * DAY)
+
+
+def grade_review(state, correct, now):
+    """sm2_review for a correct or incorrect answer."""
+    return sm2_review(state, CORRECT_QUALITY if correct else INCORRECT_QUALITY, now)
+
+
+# --- Due Index ---
+class Scheduler:
+    """Chooses the next card for one learner within a filtered set of cards.
+
+    Cards are addressed by their position in the filtered set. Reviewed cards sit in a heap
+    ordered by due time (stale entries are skipped lazily), so picking or rescheduling a card
+    is O(log n); unreviewed cards are served afterwards in the given new-card order.
+    """
+
+    def __init__(self, card_keys, states=None, new_order=None):
+        """card_keys: stable key per position; states: {card_key: ReviewState} of reviewed cards."""
+        self.card_keys = np.asarray(card_keys)
+        self.states = {}
+        self._due = {} # position -> due time of its live heap entry
+        self._heap = []
+        states = states or {}
+        if states:
+            # Map stored keys back to positions with a sorted lookup instead of a dict of every card
+            order = np.argsort(self.card_keys, kind='stable')
+            sorted_keys = self.card_keys[order]
+            stored = np.fromiter(states.keys(), dtype=self.card_keys.dtype, count=len(states))
+            slots = np.searchsorted(sorted_keys, stored)
+            for key, slot in zip(stored.tolist(), slots.tolist()):
+                if slot < len(sorted_keys) and sorted_keys[slot] == key:
+                    position = int(order[slot])
+                    self.states[key] = states[key]
+                    self._due[position] = states[key].due
+                    self._heap.append((states[key].due, position))
+            heapq.heapify(self._heap)
+        self._new_order = list(range(len(self.card_keys))) if new_order is None else new_order
+        self._new_index = 0
+
+    def _top(self):
+        """Earliest live heap entry, discarding stale ones."""
+        while self._heap:
+            due, position = self._heap[0]
+            if self._due.get(position) == due:
+                return due, position
+            heapq.heappop(self._heap)
+        return None
+
+    def _next_new(self):
+        while self._new_index < len(self._new_order):
+            position = self._new_order[self._new_index]
+            if position not in self._due:
+                return position
+            self._new_index += 1 # Already reviewed (e.g. in an earlier session)
+        return None
+
+    def next_card(self, now):
+        """Position of the card to study now: the most overdue card, else a new card, else None."""
+        top = self._top()
+        if top is not None and top[0] <= now:
+            return top[1]
+        return self._next_new()
+
+    def next_due_time(self):
+        """When the earliest scheduled card becomes due (None if nothing is scheduled)."""
+        top = self._top()
+        return top[0] if top else None
+
+    def review(self, position, correct, now):
+        """Grades the card at `position` and reschedules it. Returns (card_key, new ReviewState)."""
+        key = int(self.card_keys[position])
+        state = grade_review(self.states.get(key, ReviewState()), correct, now)
+        self.states[key] = state
+        self._due[position] = state.due
+        heapq.heappush(self._heap, (state.due, position))
+        return key, state
+
+    def new_remaining(self):
+        """Number of cards in this set that have never been reviewed."""
+        return len(self.card_keys) - len(self._due)
+
+
+# --- Review Store ---
+class ReviewStore:
+    """Review states and history in SQLite. record() only enqueues; a background thread
+    writes queued reviews in batched transactions, so answering never waits on the disk."""
+
+    def __init__(self, path=REVIEW_DB, batch_size=256, flush_interval=0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        conn = self._connect()
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL") # Readers don't block the writer
+            conn.execute("""CREATE TABLE IF NOT EXISTS card_state (
+                learner TEXT NOT NULL, card_key INTEGER NOT NULL,
+                ease REAL, interval REAL, repetitions INTEGER, lapses INTEGER, due REAL,
+                PRIMARY KEY (learner, card_key))""")
+            conn.execute("""CREATE TABLE IF NOT EXISTS review_log (
+                learner TEXT NOT NULL, card_key INTEGER NOT NULL, reviewed_at REAL, correct INTEGER)""")
+        conn.close()
+        self._writer = threading.Thread(target=self._write_loop, name='review-writer', daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def load_states(self, learner):
+        """All stored review states of a learner as {card_key: ReviewState}."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT card_key, ease, interval, repetitions, lapses, due FROM card_state WHERE learner = ?",
+                (learner,)).fetchall()
+        finally:
+            conn.close()
+        return {row[0]: ReviewState(*row[1:]) for row in rows}
+
+    def load_state(self, learner, card_key):
+        """The stored review state of one card, or None."""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT ease, interval, repetitions, lapses, due FROM card_state WHERE learner = ? AND card_key = ?",
+                (learner, card_key)).fetchone()
+        finally:
+            conn.close()
+        return None if row is None else ReviewState(*row)
+
+    def record(self, learner, card_key, state, correct, reviewed_at=None):
+        """Queues one review for writing; returns immediately."""
+        reviewed_at = time.time() if reviewed_at is None else reviewed_at
+        self._queue.put((learner, card_key, state.ease, state.interval, state.repetitions,
+                         state.lapses, state.due, reviewed_at, int(correct)))
+
+    def flush(self, timeout=None):
+        """Blocks until everything queued so far is committed."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            batch, waiters = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            # Collect until the batch is full, the interval has passed or a flush is requested
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    with conn:
+                        conn.executemany(
+                            """INSERT INTO card_state (learner, card_key, ease, interval, repetitions, lapses, due)
+                               VALUES (?, ?, ?, ?, ?, ?, ?)
+                               ON CONFLICT (learner, card_key) DO UPDATE SET ease = excluded.ease,
+                               interval = excluded.interval, repetitions = excluded.repetitions,
+                               lapses = excluded.lapses, due = excluded.due""",
+                            [row[:7] for row in batch])
+                        conn.executemany(
+                            "INSERT INTO review_log (learner, card_key, reviewed_at, correct) VALUES (?, ?, ?, ?)",
+                            [(row[0], row[1], row[7], row[8]) for row in batch])
+                except sqlite3.Error as e:
+                    print(f"Warning: Failed to save {len(batch)} review(s): {e}")
+            for waiter in waiters:
+                waiter.set()
@@ -0,0 +1,73 @@
+# search_index.py
+# Inverted token index over the cards' question and option text, for the sidebar search.
+# Tokens are lowercased words; the vocabulary is sorted and the postings are stored as one
+# CSR array (token i's card ids are postings[offsets[i]:offsets[i + 1]]), so every token
+# starting with a prefix is a contiguous vocabulary range and its cards one postings slice.
+import array
+import bisect
+import re
+
+import numpy as np
+
+# --- Configuration ---
+TOKEN_RE = re.compile(r'\w+')
+_MAX_CHAR = '\U0010ffff' # Sorts after every character, to end a prefix range
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+class SearchIndex:
+    """Word-prefix search over a tuple of Card records; results are sorted card positions."""
+
+    def __init__(self, cards):
+        self.num_cards = len(cards)
+        codes = {} # token -> code in order of first appearance
+        token_codes = array.array('i')
+        card_ids = array.array('i')
+        for card_id, card in enumerate(cards):
+            text = card.question + ' ' + ' '.join(card.options)
+            for token in set(tokenize(text)):
+                token_codes.append(codes.setdefault(token, len(codes)))
+                card_ids.append(card_id)
+
+        self.vocabulary = sorted(codes)
+        rank = np.empty(len(codes), dtype=np.int32) # code -> position in the sorted vocabulary
+        rank[[codes[token] for token in self.vocabulary]] = np.arange(len(codes), dtype=np.int32)
+        token_ranks = rank[np.frombuffer(token_codes, dtype=np.int32)] if len(token_codes) else np.empty(0, dtype=np.int32)
+        # A stable sort keeps each token's card ids ascending (they were appended in card order)
+        order = np.argsort(token_ranks, kind='stable')
+        self.postings = np.frombuffer(card_ids, dtype=np.int32)[order] if len(card_ids) else np.empty(0, dtype=np.int32)
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(token_ranks, minlength=len(codes))))).astype(np.int64)
+
+    def prefix_matches(self, prefix):
+        """Sorted, unique card positions with a token starting with `prefix`."""
+        lo = bisect.bisect_left(self.vocabulary, prefix)
+        hi = bisect.bisect_left(self.vocabulary, prefix + _MAX_CHAR, lo)
+        if lo == hi:
+            return np.empty(0, dtype=np.int32)
+        if hi == lo + 1: # One token: its postings are already sorted and unique
+            return self.postings[self.offsets[lo]:self.offsets[hi]]
+        # Several tokens: mark their cards instead of sorting the concatenated postings
+        marks = np.zeros(self.num_cards, dtype=bool)
+        marks[self.postings[self.offsets[lo]:self.offsets[hi]]] = True
+        return np.flatnonzero(marks).astype(np.int32)
+
+    def search(self, query, within=None):
+        """Card positions matching every word of `query` as a word prefix (None for an empty query).
+
+        within: optional positions to restrict the results to (e.g. the selected chapters).
+        """
+        terms = sorted(set(tokenize(query)), key=len, reverse=True) # Longest (most selective) first
+        if not terms:
+            return None
+        result = None
+        for term in terms:
+            matches = self.prefix_matches(term)
+            result = matches if result is None else np.intersect1d(result, matches, assume_unique=True)
+            if len(result) == 0:
+                break
+        if within is not None:
+            result = np.intersect1d(result, within, assume_unique=True)
+        return result
@@ -0,0 +1,314 @@
+# service.py
+# JSON/HTTP front end to the quiz for running many worker processes behind a load balancer.
+# Workers hold only the read-only deck; every quiz session lives in the session store
+# (session_store.py), so any worker can serve any request. Needs: pip install starlette uvicorn
+# Usage: python service.py [--port 8000] [--workers 4] [--session-store sqlite:sessions.sqlite3]
+#
+# GET  /chapters                   chapter names and card counts
+# POST /sessions                   start a quiz {"chapters": [...], "learner": "...", "spaced_repetition": false}
+# GET  /sessions/{id}              the current card (answers hidden until submitted)
+# POST /sessions/{id}/answer       grade {"selection": "option" | ["option", ...] | option bitmask}
+# POST /sessions/{id}/next         move on to the next card
+# PUT  /sessions/{id}/chapters     restart with a new selection {"chapters": [...]}
+# DELETE /sessions/{id}
+import argparse
+import contextlib
+import os
+import secrets
+import threading
+from collections import OrderedDict
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from deck_watcher import DeckWatcher
+from event_log import EVENT_LOG, AnswerEventLog
+from quiz import QuizEngine
+from scheduler import REVIEW_DB, ReviewStore
+from session_store import SESSION_DB, open_session_store
+from sharded_deck import load_deck
+
+# --- Configuration ---
+# Read from the environment so that every uvicorn worker process picks up the CLI settings
+DATA_FILE = os.environ.get('FLASHCARDS_DATA', 'iot_flashcards_v2.csv')
+SESSION_STORE = os.environ.get('FLASHCARDS_SESSION_STORE', f'sqlite:{SESSION_DB}')
+REVIEW_STORE = os.environ.get('FLASHCARDS_REVIEW_DB', REVIEW_DB)
+ANSWER_EVENTS = os.environ.get('FLASHCARDS_EVENT_LOG', EVENT_LOG) # Empty string disables the log
+SHARD_BUDGET_MB = float(os.environ.get('FLASHCARDS_SHARD_BUDGET_MB') or 0) # 0: load the whole deck
+SESSION_CACHE_SIZE = 1024 # Rebuilt sessions a worker keeps for requests that come back to it
+
+
+class QuizService:
+    """Loads a session from the store, applies one operation and saves it back.
+
+    Saves are compare-and-set on the stored version: if two requests race on the same
+    session, the second one gets a 409 instead of overwriting the first one's answer.
+    Rebuilt sessions are cached per worker and reused while their version is current.
+    """
+
+    def __init__(self, engine, store, cache_size=SESSION_CACHE_SIZE):
+        self.engine = engine
+        self.store = store
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._cache = OrderedDict() # session_id -> (version, QuizSession), least recently used first
+
+    def _checkout(self, session_id):
+        """Returns (version, session). The session is taken out of the cache while in use."""
+        entry = self.store.get(session_id)
+        if entry is None:
+            raise HTTPException(404, "Unknown quiz session.")
+        version, state = entry
+        with self._lock:
+            cached = self._cache.pop(session_id, None)
+        if cached is not None and cached[0] == version:
+            return version, cached[1]
+        return version, self.engine.restore_session(state)
+
+    def _checkin(self, session_id, version, session):
+        with self._lock:
+            self._cache[session_id] = (version, session)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _save(self, session_id, session, version):
+        new_version = self.store.put(session_id, session.to_state(), version)
+        if new_version is None:
+            raise HTTPException(409, "The quiz session was changed by another request; reload it.")
+        self._checkin(session_id, new_version, session)
+
+    def create(self, chapters, learner, spaced_repetition):
+        session = self.engine.new_session(chapters, learner=learner, spaced_repetition=spaced_repetition)
+        session_id = secrets.token_urlsafe(16)
+        self._save(session_id, session, 0)
+        return session_id, session
+
+    def view(self, session_id):
+        version, session = self._checkout(session_id)
+        review_card = session.review_card
+        payload = session_payload(session_id, session)
+        if session.review_card != review_card:
+            self._save(session_id, session, version) # The scheduler picked the card to show
+        else:
+            self._checkin(session_id, version, session)
+        return payload
+
+    def update(self, session_id, operation):
+        """Applies operation(session) and saves the session; returns its card payload."""
+        version, session = self._checkout(session_id)
+        operation(session)
+        payload = session_payload(session_id, session)
+        self._save(session_id, session, version)
+        return payload
+
+    def delete(self, session_id):
+        with self._lock:
+            self._cache.pop(session_id, None)
+        self.store.delete(session_id)
+
+
+def session_payload(session_id, session):
+    """The JSON view of a session and its current card."""
+    payload = {
+        'session_id': session_id,
+        'chapters': session.selected_chapters,
+        'spaced_repetition': session.spaced_repetition,
+        'score': {'correct': session.correct_count, 'answered': session.total_answered},
+        'progress': {'index': session.index, 'total': len(session)},
+        'card': None,
+        'result': None,
+    }
+    position = session.current_position()
+    if position is None:
+        if session.spaced_repetition:
+            payload['new_remaining'] = session.new_remaining()
+            payload['next_due'] = session.next_due_time()
+        return payload
+
+    card = session.card(position)
+    payload['card'] = {'position': position, 'chapter': card.chapter, 'question': card.question,
+                       'options': list(card.options), 'multiple': card.is_multi}
+    result = session.last_result
+    if result is not None:
+        payload['result'] = {'correct': result.is_correct, 'selected': card.mask_options(result.mask),
+                             'correct_answers': card.mask_options(card.answer_mask)}
+    return payload
+
+
+# --- Request helpers ---
+async def read_json(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(400, "Request body must be JSON.")
+    if not isinstance(body, dict):
+        raise HTTPException(400, "Request body must be a JSON object.")
+    return body
+
+
+def parse_chapters(engine, value):
+    """Validates a chapter selection (None selects every chapter)."""
+    if value is None:
+        return engine.chapters
+    if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+        raise HTTPException(400, "'chapters' must be a list of chapter names.")
+    unknown = sorted(set(value) - set(engine.chapters))
+    if unknown:
+        raise HTTPException(400, f"Unknown chapters: {', '.join(unknown)}")
+    return value
+
+
+def parse_flag(body, name, default=False):
+    value = body.get(name, default)
+    if not isinstance(value, bool): # bool("false") would be True
+        raise HTTPException(400, f"'{name}' must be true or false.")
+    return value
+
+
+def parse_selection(value):
+    if isinstance(value, (str, int)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, list) and all(isinstance(opt, str) for opt in value):
+        return value
+    raise HTTPException(400, "'selection' must be an option, a list of options or an option bitmask.")
+
+
+def submit(session, selection):
+    card = session.current_card()
+    if card is None:
+        raise HTTPException(400, "There is no card to answer.")
+    # Checked before grading, so an invalid bitmask is neither scored nor logged
+    if isinstance(selection, int) and not 0 <= selection < 1 << len(card.options):
+        raise HTTPException(400, f"'selection' bitmask must be between 0 and {(1 << len(card.options)) - 1}.")
+    session.submit(selection)
+
+
+# --- Endpoints ---
+async def health(request):
+    return JSONResponse({'status': 'ok', 'cards': len(request.app.state.service.engine.deck)})
+
+
+async def list_chapters(request):
+    deck = request.app.state.service.engine.deck
+    return JSONResponse({'chapters': [{'name': name, 'cards': deck.chapter_counts[name]}
+                                      for name in deck.chapters]})
+
+
+async def create_session(request):
+    service = request.app.state.service
+    body = await read_json(request)
+    chapters = parse_chapters(service.engine, body.get('chapters'))
+    learner = str(body.get('learner', 'local'))
+    spaced_repetition = parse_flag(body, 'spaced_repetition')
+    session_id, session = await run_in_threadpool(service.create, chapters, learner, spaced_repetition)
+    return JSONResponse(await run_in_threadpool(service.view, session_id), status_code=201)
+
+
+async def get_session(request):
+    service = request.app.state.service
+    return JSONResponse(await run_in_threadpool(service.view, request.path_params['session_id']))
+
+
+async def answer(request):
+    service = request.app.state.service
+    selection = parse_selection((await read_json(request)).get('selection'))
+    payload = await run_in_threadpool(service.update, request.path_params['session_id'],
+                                      lambda session: submit(session, selection))
+    return JSONResponse(payload)
+
+
+async def next_card(request):
+    service = request.app.state.service
+    payload = await run_in_threadpool(service.update, request.path_params['session_id'],
+                                      lambda session: session.next())
+    return JSONResponse(payload)
+
+
+async def set_chapters(request):
+    service = request.app.state.service
+    body = await read_json(request)
+    if 'chapters' not in body:
+        raise HTTPException(400, "'chapters' is required.")
+    chapters = parse_chapters(service.engine, body['chapters'])
+    payload = await run_in_threadpool(service.update, request.path_params['session_id'],
+                                      lambda session: session.reset(chapters))
+    return JSONResponse(payload)
+
+
+async def delete_session(request):
+    service = request.app.state.service
+    await run_in_threadpool(service.delete, request.path_params['session_id'])
+    return JSONResponse({'deleted': True})
+
+
+async def http_error(request, exc):
+    return JSONResponse({'error': exc.detail}, status_code=exc.status_code)
+
+
+def create_app(data_file=None, session_store=None, review_db=None, event_log=None, shard_budget_mb=None):
+    """Builds the app for one worker: loads the deck and opens the review, event and session stores."""
+    data_file = data_file or DATA_FILE
+    shard_budget_mb = SHARD_BUDGET_MB if shard_budget_mb is None else shard_budget_mb
+    deck = load_deck(data_file, shard_budget_mb)
+    if len(deck) == 0:
+        raise SystemExit("No valid flashcards found after validation. Check CSV content.")
+    review_store = ReviewStore(review_db or REVIEW_STORE)
+    event_log = event_log if event_log is not None else ANSWER_EVENTS
+    answer_log = AnswerEventLog(event_log) if event_log else None # Workers append to the same file
+    engine = QuizEngine(deck, review_store, answer_log)
+    service = QuizService(engine, open_session_store(session_store or SESSION_STORE))
+    watcher = DeckWatcher(data_file, engine, shard_budget_mb=shard_budget_mb) # Reloads the deck when the CSV changes
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        watcher.start()
+        yield
+        watcher.stop()
+        await run_in_threadpool(review_store.flush) # Don't drop queued reviews on shutdown
+        if answer_log is not None:
+            await run_in_threadpool(answer_log.flush)
+
+    app = Starlette(routes=[
+        Route('/health', health),
+        Route('/chapters', list_chapters),
+        Route('/sessions', create_session, methods=['POST']),
+        Route('/sessions/{session_id}', get_session, methods=['GET']),
+        Route('/sessions/{session_id}', delete_session, methods=['DELETE']),
+        Route('/sessions/{session_id}/answer', answer, methods=['POST']),
+        Route('/sessions/{session_id}/next', next_card, methods=['POST']),
+        Route('/sessions/{session_id}/chapters', set_chapters, methods=['PUT']),
+    ], exception_handlers={HTTPException: http_error}, lifespan=lifespan)
+    app.state.service = service
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the flashcard quiz as a JSON/HTTP API.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes")
+    parser.add_argument('--data', default=DATA_FILE, help="Flashcard CSV")
+    parser.add_argument('--session-store', default=SESSION_STORE, help="'memory' or 'sqlite[:path]'")
+    parser.add_argument('--review-db', default=REVIEW_STORE, help="SQLite file for spaced-repetition reviews")
+    parser.add_argument('--event-log', default=ANSWER_EVENTS, help="Answer event log for analytics.py ('' to disable)")
+    parser.add_argument('--shard-budget-mb', type=float, default=SHARD_BUDGET_MB,
+                        help="Serve the deck as per-chapter shards with this cache budget per worker (0: whole deck)")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    if args.workers > 1 and args.session_store.partition(':')[0] == 'memory':
+        print("Warning: The memory session store is per process; sessions will not be shared between workers.")
+    os.environ['FLASHCARDS_DATA'] = args.data
+    os.environ['FLASHCARDS_SESSION_STORE'] = args.session_store
+    os.environ['FLASHCARDS_REVIEW_DB'] = args.review_db
+    os.environ['FLASHCARDS_EVENT_LOG'] = args.event_log
+    os.environ['FLASHCARDS_SHARD_BUDGET_MB'] = str(args.shard_budget_mb)
+    uvicorn.run('service:create_app', factory=True, host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
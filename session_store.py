@@ -0,0 +1,103 @@
+# session_store.py
+# Where the HTTP quiz service keeps QuizSession states (QuizSession.to_state() dicts), so any
+# worker process can serve any request. Writes are versioned (compare-and-set) so two requests
+# for the same session can't silently overwrite each other.
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# --- Configuration ---
+SESSION_DB = 'sessions.sqlite3'
+MAX_MEMORY_SESSIONS = 100_000 # Oldest sessions are dropped from a MemorySessionStore beyond this
+
+
+class MemorySessionStore:
+    """Session states in a dict. Only for a single worker process (or tests)."""
+
+    def __init__(self, max_sessions=MAX_MEMORY_SESSIONS):
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict() # session_id -> (version, state), least recently used first
+
+    def get(self, session_id):
+        """Returns (version, state), or None for an unknown session."""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                self._sessions.move_to_end(session_id)
+            return entry
+
+    def put(self, session_id, state, expected_version=0):
+        """Saves `state` if the stored version is still `expected_version` (0 for a new session).
+
+        Returns the new version, or None if another request updated the session first.
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if (entry[0] if entry else 0) != expected_version:
+                return None
+            self._sessions[session_id] = (expected_version + 1, state)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return expected_version + 1
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class SQLiteSessionStore:
+    """Session states in a local SQLite file, shared by the worker processes of one machine."""
+
+    def __init__(self, path=SESSION_DB):
+        self.path = path
+        self._local = threading.local() # One connection per thread
+        conn = self._connect()
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL") # Readers don't block the writer
+            conn.execute("""CREATE TABLE IF NOT EXISTS quiz_session (
+                session_id TEXT PRIMARY KEY, version INTEGER NOT NULL, state TEXT NOT NULL, updated_at REAL)""")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL") # Durable enough for quiz progress, much faster
+        return conn
+
+    def get(self, session_id):
+        row = self._connect().execute(
+            "SELECT version, state FROM quiz_session WHERE session_id = ?", (session_id,)).fetchone()
+        return None if row is None else (row[0], json.loads(row[1]))
+
+    def put(self, session_id, state, expected_version=0):
+        conn = self._connect()
+        data = json.dumps(state, separators=(',', ':'))
+        with conn:
+            if expected_version == 0:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO quiz_session (session_id, version, state, updated_at) VALUES (?, 1, ?, ?)",
+                    (session_id, data, time.time()))
+            else:
+                cursor = conn.execute(
+                    "UPDATE quiz_session SET version = version + 1, state = ?, updated_at = ? WHERE session_id = ? AND version = ?",
+                    (data, time.time(), session_id, expected_version))
+        return expected_version + 1 if cursor.rowcount == 1 else None
+
+    def delete(self, session_id):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM quiz_session WHERE session_id = ?", (session_id,))
+
+
+def open_session_store(spec):
+    """Opens a store from a spec string: 'memory' or 'sqlite[:path]'."""
+    kind, _, path = spec.partition(':')
+    if kind == 'memory':
+        return MemorySessionStore()
+    if kind == 'sqlite':
+        return SQLiteSessionStore(path or SESSION_DB)
+    raise ValueError(f"Unknown session store '{spec}' (expected 'memory' or 'sqlite[:path]')")
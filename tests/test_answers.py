@@ -0,0 +1,57 @@
+# tests/test_answers.py
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from deck import Card, Deck, prepare_flashcards, validate_flashcards
+from event_log import AnswerEventLog, read_events
+from quiz import AnswerResult, QuizEngine, QuizSession
+
+
+def make_session():
+    df, _ = validate_flashcards(prepare_flashcards(pd.DataFrame([
+        {'Chapter': 'C1', 'Question': 'Q1', 'Options': 'a|b|c', 'Correct Answer': 'b'},
+    ])))
+    return QuizSession(QuizEngine(Deck(df)), ['C1'])
+
+
+@pytest.mark.parametrize('mask', [-1, 0b1000, 1 << 64])
+def test_out_of_range_mask_is_rejected(mask):
+    with pytest.raises(ValueError):
+        AnswerResult(Card(1, 'c', 'q', ['a', 'b', 'c'], 'b'), mask)
+
+
+def test_service_rejects_out_of_range_mask_before_grading():
+    service = pytest.importorskip('service')
+    session = make_session()
+    with pytest.raises(service.HTTPException) as excinfo:
+        service.submit(session, 1 << 64)
+    assert excinfo.value.status_code == 400
+    assert session.total_answered == 0 and session.last_result is None
+    service.submit(session, 0b010)
+    assert session.last_result.is_correct
+
+
+def test_event_log_drops_only_the_bad_record(tmp_path):
+    path = str(tmp_path / 'answers.events')
+    log = AnswerEventLog(path, flush_interval=60)
+    log.record('learner', 1, 0b01, True, 1.0, submitted_at=10.0)
+    log.record('learner', 2, -1, False, 1.0, submitted_at=11.0)
+    log.record('learner', 3, 0b10, False, 1.0, submitted_at=12.0)
+    assert log.flush(timeout=5)
+    events = read_events(path)
+    assert events['card_key'].tolist() == [1, 3]
+    assert events['selected'].tolist() == [0b01, 0b10]
+
+
+@pytest.mark.parametrize('value', ['false', '0', 0, None])
+def test_service_requires_a_boolean_spaced_repetition(value):
+    service = pytest.importorskip('service')
+    with pytest.raises(service.HTTPException) as excinfo:
+        service.parse_flag({'spaced_repetition': value}, 'spaced_repetition')
+    assert excinfo.value.status_code == 400
+    assert service.parse_flag({}, 'spaced_repetition') is False
+    assert service.parse_flag({'spaced_repetition': True}, 'spaced_repetition') is True
@@ -0,0 +1,54 @@
+# tests/test_deck.py
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from compiled_deck import CompiledDeck, compile_deck, compile_flashcards
+from deck import Card, Deck, prepare_flashcards, validate_flashcards
+from quiz import AnswerResult
+
+# The shipped card that repeats its correct option
+DUPLICATED_ROW = {
+    'Chapter': 'Chapter 3', 'Question_No': 7,
+    'Question': 'What is a disadvantage of simple flooding in mesh networks?',
+    'Options': 'Redundant messages|Lack of data security|Too simple|Redundant messages|Battery use',
+    'Correct Answer': 'Redundant messages',
+}
+
+
+def duplicated_frame():
+    df, rejected_df = validate_flashcards(prepare_flashcards(pd.DataFrame([DUPLICATED_ROW])))
+    assert rejected_df.empty
+    return df
+
+
+def test_repeated_option_is_listed_once():
+    assert duplicated_frame()['Options'][0] == ['Redundant messages', 'Lack of data security', 'Too simple', 'Battery use']
+
+
+def test_duplicated_option_card_grades_correct():
+    card = Deck(duplicated_frame()).cards[0]
+    assert card.answer_mask == 0b1
+    assert AnswerResult(card, 'Redundant messages').is_correct
+    assert AnswerResult(card, 0b1).is_correct
+
+
+def test_compiled_deck_mask_matches():
+    deck = CompiledDeck(compile_flashcards(duplicated_frame())).to_deck()
+    assert deck.cards[0].answer_mask == 0b1
+    assert AnswerResult(deck.cards[0], 'Redundant messages').is_correct
+
+
+def test_card_masks_first_of_repeated_options():
+    card = Card(b'k', 'c', 'q', ['a', 'b', 'a'], 'a')
+    assert card.answer_mask == 0b001
+    assert AnswerResult(card, 'a').is_correct
+
+
+def test_compiled_deck_is_world_readable(tmp_path):
+    csv_path = tmp_path / 'deck.csv'
+    csv_path.write_text("Chapter,Question,Options,Correct Answer\nC1,Q1,a|b,a\n")
+    deck_path = compile_deck(str(csv_path), str(tmp_path / 'deck.deck'))
+    assert os.stat(deck_path).st_mode & 0o777 == 0o644
@@ -0,0 +1,30 @@
+# tests/test_docx_cache.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+process_docx_highlight = pytest.importorskip('process_docx_highlight')
+from process_docx_highlight import ConversionCache, ParagraphSummary
+
+
+def test_cache_version_bump_reparses(tmp_path, monkeypatch):
+    docx_path = tmp_path / 'deck.docx'
+    docx_path.write_bytes(b'unchanged document bytes')
+    paragraphs = [ParagraphSummary('1. What is IoT?', frozenset(), ())]
+    reads = []
+
+    def read_paragraphs():
+        reads.append(1)
+        return paragraphs
+
+    cache = ConversionCache(str(tmp_path / 'cache'))
+    cache.flashcards(str(docx_path), read_paragraphs)
+    cache.flashcards(str(docx_path), read_paragraphs)
+    assert len(reads) == 1 # Second call is a file-level hit
+
+    monkeypatch.setattr(process_docx_highlight, 'CACHE_VERSION', process_docx_highlight.CACHE_VERSION + 1)
+    cache.flashcards(str(docx_path), read_paragraphs)
+    assert len(reads) == 2
+    assert cache.last_status.startswith('re-parsed 1 of 1')
@@ -0,0 +1,101 @@
+# tests/test_quiz.py
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from deck import Deck, prepare_flashcards, validate_flashcards
+from deck_watcher import DeckWatcher
+from permutation import PrefixedPermutation
+from quiz import QuizEngine, QuizSession
+from scheduler import ReviewState, ReviewStore
+from sharded_deck import load_deck
+
+
+def make_deck(num_cards, chapter='C1', fingerprint=None):
+    rows = [{'Chapter': chapter, 'Question': f'Q{i}', 'Options': 'a|b|c', 'Correct Answer': 'b'} for i in range(num_cards)]
+    df, _ = validate_flashcards(prepare_flashcards(pd.DataFrame(rows)))
+    return Deck(df, fingerprint=fingerprint)
+
+
+def test_remap_keeps_passed_and_current_cards():
+    engine = QuizEngine(make_deck(50))
+    session = QuizSession(engine, ['C1'], seed=7)
+    for _ in range(10):
+        session.submit(0b010)
+        session.next()
+    passed = [session.card(session.order[i]).question for i in range(10)]
+    current = session.current_card().question
+    session.submit(0b001)
+
+    engine.swap_deck(make_deck(60)) # Ten new cards
+    assert len(session) == 60
+    assert [session.card(session.order[i]).question for i in range(10)] == passed
+    assert session.current_card().question == current
+    assert session.answered and not session.last_result.is_correct
+    assert sorted(session.order) == list(range(60))
+    assert (session.correct_count, session.total_answered) == (10, 11)
+
+
+def test_reload_with_unchanged_content_keeps_the_deck(tmp_path):
+    csv_path = tmp_path / 'deck.csv'
+    deck_path = str(tmp_path / 'deck.deck')
+    csv_path.write_text("Chapter,Question,Options,Correct Answer\nC1,Q1,a|b,a\nC1,Q2,a|b,b\n")
+    engine = QuizEngine(load_deck(str(csv_path), deck_path=deck_path))
+    watcher = DeckWatcher(str(csv_path), engine, deck_path=deck_path)
+
+    os.utime(csv_path, ns=(0, 0)) # Touched, same content
+    assert not watcher.reload()
+    assert engine.deck_version == 1
+
+    csv_path.write_text("Chapter,Question,Options,Correct Answer\nC1,Q1,a|b,a\nC1,Q3,a|b,b\n")
+    assert watcher.reload()
+    assert engine.deck_version == 2
+    assert engine.deck._search_index is not None # Built before the swap
+
+
+def test_remapped_session_state_stays_small():
+    engine = QuizEngine(make_deck(2000, fingerprint='v1'))
+    session = QuizSession(engine, ['C1'], seed=3)
+    for _ in range(5):
+        session.submit(0b010)
+        session.next()
+    engine.swap_deck(make_deck(2100, fingerprint='v2'))
+    state = session.to_state()
+    assert len(state['order']['head']) == 6 # Five passed cards and the current one
+    restored = QuizSession.from_state(engine, state)
+    assert list(restored.order) == list(session.order)
+    assert sorted(restored.order) == list(range(2100))
+    assert restored.current_card().question == session.current_card().question
+
+
+def test_prefixed_permutation_is_a_permutation():
+    order = PrefixedPermutation([9, 2, 5], 12, seed=1)
+    assert order[:3] == [9, 2, 5]
+    assert sorted(order) == list(range(12))
+
+
+def test_scheduler_is_built_only_for_spaced_repetition():
+    engine = QuizEngine(make_deck(20))
+    session = QuizSession(engine, ['C1'], seed=5)
+    session.submit(0b010)
+    session.next()
+    assert session._scheduler is None
+    key = session.recent_reviews[-1][0]
+    session.set_spaced_repetition(True)
+    assert session.current_position() is not None
+    assert session._scheduler is not None
+    assert key in session.scheduler.states # The review made before it was built
+
+
+def test_shuffled_answer_continues_the_stored_review_state(tmp_path):
+    store = ReviewStore(str(tmp_path / 'reviews.sqlite3'))
+    engine = QuizEngine(make_deck(5), review_store=store)
+    session = QuizSession(engine, ['C1'], seed=2)
+    card_key = session.current_card().key
+    store.record('local', card_key, ReviewState(repetitions=2, interval=6.0), True, 0.0)
+    assert store.flush(timeout=5)
+    session.submit(0b010)
+    assert session.recent_reviews[-1][0] == card_key
+    assert session.recent_reviews[-1][3] == 3 # repetitions
@@ -0,0 +1,56 @@
+# tests/test_sharded_deck.py
+import gc
+import os
+import sys
+import weakref
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from quiz import QuizEngine, QuizSession
+from sharded_deck import load_sharded_deck
+
+
+def write_csv(path, chapters=3, cards=4):
+    rows = [f"C{c},Q{c}-{i},a|b,a" for c in range(chapters) for i in range(cards)]
+    path.write_text("Chapter,Question,Options,Correct Answer\n" + "\n".join(rows) + "\n")
+
+
+def test_select_reuses_combined_decks(tmp_path):
+    csv_path = tmp_path / 'deck.csv'
+    write_csv(csv_path)
+    deck = load_sharded_deck(str(csv_path))
+    first, card_ids = deck.select(['C0', 'C2'])
+    assert len(card_ids) == 8
+    assert deck.select(['C2', 'C0'])[0] is first
+    assert deck.select(['C0', 'C1'])[0] is not first
+
+
+def test_evicted_chapter_drops_its_combined_decks(tmp_path):
+    csv_path = tmp_path / 'deck.csv'
+    write_csv(csv_path)
+    deck = load_sharded_deck(str(csv_path), memory_budget=1) # Keeps one chapter at a time
+    first = weakref.ref(deck.select(['C0', 'C1'])[0])
+    deck.select(['C2'])
+    assert deck.evictions > 0
+    gc.collect()
+    assert first() is None # No session uses it, and the cache let it go
+
+
+def test_over_budget_sessions_share_chapter_decks(tmp_path):
+    csv_path = tmp_path / 'deck.csv'
+    write_csv(csv_path, chapters=20)
+    deck = load_sharded_deck(str(csv_path), memory_budget=1) # Far less than a session selects
+    engine = QuizEngine(deck)
+    sessions = [QuizSession(engine, deck.chapters, seed=i) for i in range(5)]
+    misses = deck.cache_info()['misses']
+    sessions += [QuizSession(engine, deck.chapters, seed=i) for i in range(5)]
+    assert deck.cache_info()['misses'] == misses == 20
+    assert all(session.deck.cards[0] is sessions[0].deck.cards[0] for session in sessions)
+
+
+def test_shard_files_are_world_readable(tmp_path):
+    csv_path = tmp_path / 'deck.csv'
+    write_csv(csv_path)
+    deck = load_sharded_deck(str(csv_path))
+    build_dir = os.path.join(deck.shard_dir, deck.manifest['build'])
+    paths = [os.path.join(deck.shard_dir, 'manifest.json')] + [os.path.join(build_dir, name) for name in os.listdir(build_dir)]
+    assert all(os.stat(path).st_mode & 0o777 == 0o644 for path in paths)
@@ -0,0 +1,28 @@
+# widget_state.py
+# Per-card widget keys in a session's state. Keys are namespaced by card and registered
+# when created, so leaving a card deletes exactly its keys instead of scanning all of them.
+
+# --- Configuration ---
+REGISTRY_KEY = '_card_widget_keys' # Session-state entry listing the live per-card widget keys
+
+
+def card_widget_key(state, card_id, name):
+    """Returns the widget key `name` of card `card_id` and registers it for release."""
+    key = f"card:{card_id}:{name}"
+    registry = state.get(REGISTRY_KEY)
+    if registry is None:
+        registry = state[REGISTRY_KEY] = {} # dict as an insertion-ordered set
+    registry[key] = None
+    return key
+
+
+def release_card_widgets(state):
+    """Deletes the widget state of the card(s) being left; O(keys of those cards)."""
+    registry = state.get(REGISTRY_KEY)
+    if not registry:
+        return
+    state[REGISTRY_KEY] = {}
+    for key in registry:
+        if key in state:
+            del state[key]
+